@@ -0,0 +1,106 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+VERSION_KEY = "catalog:ver:{}"
+RESPONSE_KEY = "catalog:resp:{}"
+
+# Параметры запроса, от которых зависит ответ; остальные в ключ не входят
+CACHE_QUERY_PARAMS = (
+    "search", "genres", "year", "sort", "page", "limit", "pagination", "cursor", "count",
+)
+
+
+def response_cache():
+    return caches[settings.CATALOG_RESPONSE_CACHE]
+
+
+def invalidate(*namespaces):
+    """Новая версия пространства имён: все закэшированные по старой версии ответы устаревают."""
+    now = time.time()
+    response_cache().set_many({VERSION_KEY.format(ns): now for ns in namespaces}, None)
+
+
+def get_versions(namespaces):
+    cache = response_cache()
+    keys = [VERSION_KEY.format(ns) for ns in namespaces]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        now = time.time()
+        for key in missing:
+            cache.add(key, now, None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, 0) for key in keys]
+
+
+def normalized_params(request):
+    params = []
+    for name in CACHE_QUERY_PARAMS:
+        values = request.query_params.getlist(name)
+        if name == "search":
+            values = [value.strip().lower() for value in values]
+        elif name == "genres":
+            values = sorted({value.lower() for value in values})
+        if values:
+            params.append((name, values))
+    return params
+
+
+class CachedResponseMixin:
+    """
+    Кэширует ответы GET анонимным пользователям и отдаёт ETag/Last-Modified,
+    чтобы nginx и браузеры могли перепроверять ответ и получать 304.
+
+    Ключ - нормализованные параметры запроса и версии пространств имён из
+    cache_namespaces(); сигналы моделей (api/signals.py) поднимают версии
+    при изменениях, так что устаревшие записи больше не читаются.
+    """
+
+    def cache_namespaces(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        if request.headers.get("Authorization"):
+            return super().get(request, *args, **kwargs)
+
+        namespaces = self.cache_namespaces()
+        versions = get_versions(namespaces)
+        raw_key = repr((
+            request.path,
+            request.get_host(),
+            normalized_params(request),
+            list(zip(namespaces, versions)),
+        ))
+        key = RESPONSE_KEY.format(hashlib.sha256(raw_key.encode()).hexdigest())
+
+        cache = response_cache()
+        entry = cache.get(key)
+        if entry is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            content = JSONRenderer().render(response.data)
+            entry = {
+                "content": content,
+                "etag": f'"{hashlib.md5(content).hexdigest()}"',
+                "last_modified": int(max(versions)),
+            }
+            cache.set(key, entry, settings.CATALOG_RESPONSE_CACHE_TTL)
+
+        response = HttpResponse(entry["content"], content_type="application/json")
+        response["ETag"] = entry["etag"]
+        response["Last-Modified"] = http_date(entry["last_modified"])
+        response["Cache-Control"] = "public, no-cache"
+        return get_conditional_response(
+            request,
+            etag=entry["etag"],
+            last_modified=entry["last_modified"],
+            response=response,
+        )
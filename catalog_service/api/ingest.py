@@ -0,0 +1,196 @@
+import csv
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .cache import invalidate
+from .models import Genre, Movie
+from .serializers import MovieBulkRowSerializer
+
+logger = logging.getLogger(__name__)
+
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+# Разделители списка жанров в CSV-колонке genres
+CSV_GENRE_SEPARATORS = ("|", ";")
+
+
+def raw_lines(stream):
+    """Построчное чтение тела запроса без загрузки его в память целиком."""
+    return iter(stream.readline, b"")
+
+
+def decode_line(raw):
+    return raw.decode("utf-8-sig" if raw.startswith(b"\xef\xbb\xbf") else "utf-8")
+
+
+def jsonl_rows(lines):
+    # Строки независимы: битая кодировка - ошибка строки, загрузка продолжается
+    for line_number, raw in enumerate(lines, 1):
+        try:
+            line = decode_line(raw)
+        except UnicodeDecodeError as e:
+            yield line_number, None, {"non_field_errors": [f"Invalid UTF-8: {e}"]}
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, {"non_field_errors": [f"Invalid JSON: {e}"]}
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, {"non_field_errors": ["Expected a JSON object"]}
+            continue
+        yield line_number, row, None
+
+
+def csv_rows(lines):
+    # После ошибки кодировки или разбора границы записей CSV неизвестны:
+    # ошибка записывается на свою строку, остаток тела не читается
+    reader = csv.DictReader(decode_line(raw) for raw in lines)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except UnicodeDecodeError as e:
+            yield reader.line_num + 1, None, {"non_field_errors": [f"Invalid UTF-8: {e}"]}
+            return
+        except csv.Error as e:
+            yield reader.line_num, None, {"non_field_errors": [f"Malformed CSV: {e}"]}
+            return
+        genres = (row.get("genres") or "").strip()
+        for separator in CSV_GENRE_SEPARATORS:
+            if separator in genres:
+                genres = genres.split(separator)
+                break
+        else:
+            genres = [genres] if genres else []
+        row["genres"] = [genre.strip() for genre in genres if genre.strip()]
+        yield reader.line_num, row, None
+
+
+class GenreResolver:
+    """Все жанры читаются одним запросом; строки ссылаются на них по id или названию."""
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_name = {}
+        for genre_id, name in Genre.objects.values_list("id", "name"):
+            self.by_id[str(genre_id)] = genre_id
+            self.by_name[name.lower()] = genre_id
+
+    def resolve(self, values):
+        ids, unknown = [], []
+        for value in values:
+            value = value.strip()
+            genre_id = self.by_id.get(value) or self.by_name.get(value.lower())
+            if genre_id is None:
+                unknown.append(value)
+            elif genre_id not in ids:
+                ids.append(genre_id)
+        return ids, unknown
+
+
+class MovieIngest:
+    """
+    Массовая загрузка фильмов из JSON Lines или CSV.
+
+    Строки проверяются сериализатором без обращений к БД, жанры сопоставляются
+    по заранее загруженному справочнику. Каждые batch_size корректных строк
+    записываются в отдельной транзакции: bulk_create фильмов, затем bulk_create
+    связей с жанрами. Ошибка БД откатывает только свою пачку.
+    """
+
+    def __init__(self, batch_size=None, max_errors=None):
+        self.batch_size = batch_size or settings.CATALOG_BULK_BATCH_SIZE
+        self.max_errors = settings.CATALOG_BULK_MAX_ERRORS if max_errors is None else max_errors
+        self.genres = GenreResolver()
+        self.rows = 0
+        self.created = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = []
+
+    def error(self, line_number, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line_number, "errors": errors})
+
+    def run(self, rows):
+        started = time.monotonic()
+        batch = []
+        for line_number, data, errors in rows:
+            self.rows += 1
+            if errors:
+                self.error(line_number, errors)
+                continue
+
+            serializer = MovieBulkRowSerializer(data=data)
+            if not serializer.is_valid():
+                self.error(line_number, serializer.errors)
+                continue
+            genre_ids, unknown = self.genres.resolve(serializer.validated_data["genres"])
+            if unknown:
+                self.error(line_number, {"genres": [f"Unknown genres: {', '.join(unknown)}"]})
+                continue
+
+            movie = Movie(
+                title=serializer.validated_data["title"],
+                release_date=serializer.validated_data["release_date"],
+            )
+            batch.append((line_number, movie, genre_ids))
+            if len(batch) >= self.batch_size:
+                self.write(batch)
+                batch = []
+        if batch:
+            self.write(batch)
+
+        if self.created:
+            # bulk_create не отправляет сигналы моделей, кэш сбрасывается вручную
+            invalidate("movies")
+
+        seconds = time.monotonic() - started
+        logger.info(
+            f"Массовая загрузка: {self.created} создано, {self.failed} ошибок "
+            f"из {self.rows} строк за {seconds:.1f} с"
+        )
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "failed": self.failed,
+            "batches": self.batches,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.rows / seconds, 1) if seconds else None,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+    def write(self, batch):
+        self.batches += 1
+        try:
+            with transaction.atomic():
+                movies = Movie.objects.bulk_create([movie for _, movie, _ in batch])
+                Movie.genres.through.objects.bulk_create(
+                    [
+                        Movie.genres.through(movie_id=movie.pk, genre_id=genre_id)
+                        for movie, (_, _, genre_ids) in zip(movies, batch)
+                        for genre_id in genre_ids
+                    ]
+                )
+                Movie.objects.filter(pk__in=[movie.pk for movie in movies]).update_search_vector()
+        except DatabaseError as e:
+            logger.error(f"Пачка из {len(batch)} строк не записана: {e}")
+            for line_number, _, _ in batch:
+                self.error(line_number, {"non_field_errors": [f"Database error: {e}"]})
+            return
+        self.created += len(batch)
+
+
+def ingest_movies(stream, content_type):
+    lines = raw_lines(stream)
+    rows = csv_rows(lines) if content_type in CSV_CONTENT_TYPES else jsonl_rows(lines)
+    return MovieIngest().run(rows)
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Название жанра')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Movie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255, verbose_name='Название фильма')),
+                ('release_date', models.DateField(verbose_name='Дата выпуска')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('genres', models.ManyToManyField(related_name='movies', to='api.genre', verbose_name='Жанры')),
+            ],
+        ),
+    ]
@@ -0,0 +1,46 @@
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+def create_search_indexes(apps, schema_editor):
+    # GIN-индексы есть только в PostgreSQL, на SQLite поиск идёт через icontains
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS api_movie_search_vector_gin "
+        "ON api_movie USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS api_movie_title_trgm "
+        "ON api_movie USING gin (title gin_trgm_ops)"
+    )
+    schema_editor.execute(
+        "UPDATE api_movie SET search_vector = to_tsvector(%s::regconfig, COALESCE(title, ''))",
+        [settings.CATALOG_SEARCH_CONFIG],
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS api_movie_title_trgm")
+    schema_editor.execute("DROP INDEX IF EXISTS api_movie_search_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='movie',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
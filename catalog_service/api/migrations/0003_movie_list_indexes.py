@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 19:08
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_movie_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='genre',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='api_genre_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['created_at', 'id'], name='api_movie_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['title', 'id'], name='api_movie_title_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['release_date', 'id'], name='api_movie_release_id_idx'),
+        ),
+    ]
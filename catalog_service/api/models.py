@@ -1,16 +1,89 @@
-from django.db import models
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+    TrigramSimilarity,
+)
+from django.db import connection, models
+from django.db.models import F, Q
+from django.db.models.functions import Lower
 
 class Genre(models.Model):
     name = models.CharField("Название жанра", max_length=100, unique=True)
 
+    class Meta:
+        indexes = [
+            # Фильтр по жанрам сравнивает lower(name)
+            models.Index(Lower("name"), name="api_genre_name_lower_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
+
+class MovieQuerySet(models.QuerySet):
+    def search(self, text):
+        """
+        Полнотекстовый поиск по названию с допуском опечаток, лучшие совпадения первыми.
+        На PostgreSQL: tsvector-индекс (слова с префиксами для поиска по мере
+        ввода) плюс триграммное сходство pg_trgm. На других СУБД - icontains.
+        """
+        if connection.vendor != "postgresql":
+            return self.filter(title__icontains=text)
+
+        words = re.findall(r"\w+", text)
+        if not words:
+            return self.filter(title__icontains=text)
+
+        config = settings.CATALOG_SEARCH_CONFIG
+        query = SearchQuery(
+            " & ".join(f"{word}:*" for word in words), config=config, search_type="raw"
+        )
+        return (
+            self.filter(Q(search_vector=query) | Q(title__trigram_similar=text))
+            .annotate(
+                rank=SearchRank(F("search_vector"), query)
+                + TrigramSimilarity("title", text)
+            )
+            .order_by("-rank", "-id")
+        )
+
+    def update_search_vector(self):
+        if connection.vendor == "postgresql":
+            self.update(
+                search_vector=SearchVector("title", config=settings.CATALOG_SEARCH_CONFIG)
+            )
+
+
 class Movie(models.Model):
     title = models.CharField("Название фильма", max_length=255)
     release_date = models.DateField("Дата выпуска")
     genres = models.ManyToManyField(Genre, related_name='movies', verbose_name='Жанры')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Заполняется при сохранении, индексируется GIN (см. миграцию 0002)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = MovieQuerySet.as_manager()
+
+    class Meta:
+        # По индексу на каждую сортировку списка (в паре с id - второй ключ сортировки
+        # и курсора); btree читается в обе стороны, поэтому DESC-сортировкам отдельный
+        # индекс не нужен. release_date_id также обслуживает фильтры year и upcoming.
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="api_movie_created_id_idx"),
+            models.Index(fields=["title", "id"], name="api_movie_title_id_idx"),
+            models.Index(fields=["release_date", "id"], name="api_movie_release_id_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "title" in update_fields:
+            Movie.objects.filter(pk=self.pk).update_search_vector()
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
@@ -25,4 +25,12 @@ class MovieCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Movie
-        fields = ['title', 'release_date', 'genres']
\ No newline at end of file
+        fields = ['title', 'release_date', 'genres']
+
+class MovieBulkRowSerializer(serializers.ModelSerializer):
+    """Строка массовой загрузки: жанры - id или названия, сопоставляются в api/ingest.py."""
+    genres = serializers.ListField(child=serializers.CharField(), allow_empty=True)
+
+    class Meta:
+        model = Movie
+        fields = ['title', 'release_date', 'genres']
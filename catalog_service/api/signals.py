@@ -0,0 +1,27 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate
+from .models import Genre, Movie
+
+
+@receiver([post_save, post_delete], sender=Movie)
+def movie_changed(sender, instance, **kwargs):
+    invalidate("movies", f"movie:{instance.pk}")
+
+
+@receiver(m2m_changed, sender=Movie.genres.through)
+def movie_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        # Изменение со стороны жанра: затронуты все его фильмы
+        invalidate("movies", "genres")
+    else:
+        invalidate("movies", f"movie:{instance.pk}")
+
+
+@receiver([post_save, post_delete], sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    # Названия жанров встроены в ответы по фильмам
+    invalidate("genres", "movies")
@@ -0,0 +1,128 @@
+import io
+import re
+import unittest
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from rest_framework.request import Request
+
+from .ingest import ingest_movies
+from .models import Genre, Movie
+from .views import MovieListView
+
+
+class CatalogQueryCountTests(TestCase):
+    """Число запросов к БД не должно расти с числом фильмов и жанров на странице."""
+
+    @classmethod
+    def setUpTestData(cls):
+        genres = [Genre.objects.create(name=name) for name in ("Drama", "Comedy", "Horror")]
+        for i in range(15):
+            movie = Movie.objects.create(title=f"Movie {i}", release_date=date(2000 + i, 1, 1))
+            movie.genres.set(genres[: i % 3 + 1])
+        cls.movie = movie
+
+    def setUp(self):
+        # Ответы для анонимов кэшируются, каждый тест должен дойти до БД
+        caches[settings.CATALOG_RESPONSE_CACHE].clear()
+
+    def test_movie_list(self):
+        # count, страница фильмов, жанры страницы
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("movie-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 15)
+
+    def test_movie_list_genre_filter(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("movie-list"), {"genres": ["drama", "HORROR"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 15)
+
+    def test_movie_detail(self):
+        # фильм и его жанры
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("movie-detail", kwargs={"id": self.movie.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["genres"]), 3)
+
+
+class MovieBulkIngestTests(TestCase):
+    """Битая строка в середине тела - ошибка строки, уже записанные пачки остаются в статистике."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Genre.objects.create(name="Drama")
+
+    def ingest(self, body, content_type):
+        with self.settings(CATALOG_BULK_BATCH_SIZE=1):
+            return ingest_movies(io.BytesIO(body), content_type)
+
+    def test_jsonl_invalid_utf8_line(self):
+        body = (
+            b'{"title": "First", "release_date": "2001-01-01", "genres": ["Drama"]}\n'
+            b'{"title": "\xff", "release_date": "2002-01-01", "genres": []}\n'
+            b'{"title": "Third", "release_date": "2003-01-01", "genres": []}\n'
+        )
+        result = self.ingest(body, "application/x-ndjson")
+        self.assertEqual((result["created"], result["failed"]), (2, 1))
+        self.assertEqual(result["errors"][0]["line"], 2)
+        self.assertEqual(Movie.objects.count(), 2)
+
+    def test_csv_invalid_utf8_stops_reading(self):
+        body = (
+            b"title,release_date,genres\n"
+            b"First,2001-01-01,Drama\n"
+            b"\xff,2002-01-01,\n"
+            b"Third,2003-01-01,\n"
+        )
+        result = self.ingest(body, "text/csv")
+        self.assertEqual((result["created"], result["failed"]), (1, 1))
+        self.assertEqual(result["errors"][0]["line"], 3)
+        self.assertEqual(Movie.objects.count(), 1)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "EXPLAIN plans are PostgreSQL-specific")
+class CatalogIndexUsageTests(TestCase):
+    """Запросы списка фильмов используют индексы миграции 0003."""
+
+    @classmethod
+    def setUpTestData(cls):
+        genres = [Genre.objects.create(name=name) for name in ("Drama", "Comedy", "Horror")]
+        for i in range(50):
+            movie = Movie.objects.create(title=f"Movie {i}", release_date=date(1980 + i, 6, 1))
+            movie.genres.set(genres[: i % 3 + 1])
+
+    def setUp(self):
+        # На маленьких тестовых таблицах планировщик иначе выбирает Seq Scan
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def list_queryset(self, **params):
+        view = MovieListView()
+        view.request = Request(RequestFactory().get("/movies/", params))
+        return view.get_queryset()[:20]
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertRegex(
+            plan, rf"(Index|Index Only|Bitmap Index) Scan (Backward )?(using|on) {re.escape(index)}\b"
+        )
+
+    def test_default_ordering(self):
+        self.assertUsesIndex(self.list_queryset(), "api_movie_created_id_idx")
+
+    def test_title_ordering(self):
+        self.assertUsesIndex(self.list_queryset(sort="title"), "api_movie_title_id_idx")
+
+    def test_year_filter(self):
+        self.assertUsesIndex(self.list_queryset(year="2000"), "api_movie_release_id_idx")
+
+    def test_genre_filter(self):
+        self.assertUsesIndex(
+            self.list_queryset(genres=["drama", "HORROR"]), "api_genre_name_lower_idx"
+        )
@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path("movies/", views.MovieListView.as_view(), name="movie-list"),
     path("movies/create/", views.MovieCreateView.as_view(), name="movie-create"),
+    path("movies/bulk/", views.MovieBulkCreateView.as_view(), name="movie-bulk-create"),
     path("movies/<int:id>/", views.MovieDetailViewById.as_view(), name="movie-detail"),
     path("movies/<int:id>/update/", views.MovieUpdateView.as_view(), name="movie-update"),
     path("movies/<int:id>/delete/", views.MovieDeleteView.as_view(), name="movie-delete"),
@@ -11,4 +12,5 @@ urlpatterns = [
     path("genres/create/", views.GenreCreateView.as_view(), name="genre-create"),
     path("genres/<int:pk>/", views.GenreDetailView.as_view(), name="genre-detail"),
     path("genres/delete/<int:pk>/", views.GenreDeleteView.as_view(), name="genre-delete"),
+    path("http-client/stats/", views.HTTPClientStatsView.as_view(), name="http-client-stats"),
 ]
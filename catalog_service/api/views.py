@@ -1,4 +1,6 @@
 # api\views.py
+import base64
+import json
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.exceptions import NotFound
@@ -7,8 +9,11 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import permission_classes
 from django.utils.timezone import now
 from datetime import date
-from django.db.models import Q
-from rest_framework.pagination import PageNumberPagination
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Lower
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+from django.db import connection
 
 from .models import Movie, Genre
 from .serializers import (
@@ -19,6 +24,9 @@ from .serializers import (
 )
 from catalog_service.auth_backends import ExternalJWTAuthentication
 from catalog_service.permissions import IsAdminOrSuperUser
+from catalog_service.http_client import http_client
+from .cache import CachedResponseMixin
+from .ingest import CSV_CONTENT_TYPES, ingest_movies
 
 
 class MoviePagination(PageNumberPagination):
@@ -34,13 +42,177 @@ class MoviePagination(PageNumberPagination):
             'results': data
         })
 
-class MovieListView(generics.ListAPIView):
+
+# Сортировки списка фильмов, id - стабильный второй ключ
+MOVIE_ORDERINGS = {
+    "latest": ("-created_at", "-id"),
+    "title": ("title", "id"),
+    "release_date": ("-release_date", "-id"),
+    "upcoming": ("release_date", "id"),
+}
+
+
+def estimate_count(queryset):
+    """
+    Примерное число строк без COUNT(*): для всей таблицы - pg_class.reltuples,
+    для отфильтрованной выборки - оценка планировщика из EXPLAIN.
+    """
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # -1 - таблица ещё ни разу не анализировалась
+            if row and row[0] >= 0:
+                return row[0]
+            return queryset.count()
+
+        sql, params = queryset.order_by().values("pk").query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]["Plan"]["Plan Rows"]
+
+
+class MovieCursorPagination(BasePagination):
+    """
+    Keyset-пагинация по (поле сортировки, id): страница выбирается условием
+    от крайней записи соседней страницы, без OFFSET, поэтому глубокие страницы
+    стоят столько же, сколько первая. count считается только по запросу:
+    count=exact - COUNT(*), count=estimate - оценка PostgreSQL.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    max_page_size = 100
+    page_size = 20
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = queryset.query.order_by
+        self.field_name = self.ordering[0].lstrip("-")
+        self.field = queryset.model._meta.get_field(self.field_name)
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        count_mode = request.query_params.get("count")
+        if count_mode == "exact":
+            self.count = queryset.count()
+        elif count_mode == "estimate":
+            self.count = estimate_count(queryset)
+        else:
+            self.count = None
+
+        backwards = bool(cursor and cursor["r"])
+        if cursor:
+            queryset = queryset.filter(self.after(cursor, backwards))
+        if backwards:
+            queryset = queryset.order_by(
+                *(name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering)
+            )
+
+        rows = list(queryset[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        return rows
+
+    def after(self, cursor, backwards):
+        """Условие "строго после позиции курсора" в порядке сортировки."""
+        descending = self.ordering[0].startswith("-") != backwards
+        op = "lt" if descending else "gt"
+        value = cursor["v"]
+        return Q(**{f"{self.field_name}__{op}": value}) | Q(
+            **{self.field_name: value, f"id__{op}": cursor["id"]}
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode()))
+            return {
+                "v": self.field.to_python(data["v"]),
+                "id": int(data["id"]),
+                "r": bool(data.get("r")),
+            }
+        except Exception:
+            raise NotFound("Invalid cursor")
+
+    def encode_cursor(self, row, backwards):
+        data = {"v": self.field.value_to_string(row), "id": row.id, "r": backwards}
+        token = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, token
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+
+class MovieListView(CachedResponseMixin, generics.ListAPIView):
     serializer_class = MovieListSerializer
     pagination_class = MoviePagination
-    queryset = Movie.objects.all()
+    # Жанры всей страницы загружаются одним запросом
+    queryset = Movie.objects.defer("search_vector").prefetch_related("genres")
     
+    @property
+    def paginator(self):
+        """
+        Постраничная пагинация по умолчанию. С ?pagination=cursor (или ?cursor=...)
+        - keyset-пагинация, если порядок задан сортировкой, а не релевантностью поиска.
+        """
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            cursor_requested = params.get("pagination") == "cursor" or "cursor" in params
+            ranked = params.get("search") and params.get("sort") not in MOVIE_ORDERINGS
+            if cursor_requested and not ranked:
+                self._paginator = MovieCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def cache_namespaces(self):
+        return ["movies"]
+
     def get_queryset(self):
-        queryset = super().get_queryset().order_by("-created_at")
+        queryset = super().get_queryset().order_by(*MOVIE_ORDERINGS["latest"])
         
         search_query = self.request.query_params.get("search", None)
         genre_names = self.request.query_params.getlist("genres", [])
@@ -48,34 +220,51 @@ class MovieListView(generics.ListAPIView):
         sort_by = self.request.query_params.get("sort", None)
 
         if search_query:
-            queryset = queryset.filter(title__icontains=search_query)
+            # Без явной сортировки результаты поиска идут по релевантности
+            queryset = queryset.search(search_query)
 
         if genre_names:
-            genre_filter = Q()
-            for genre_name in genre_names:
-                genre_filter |= Q(genres__name__iexact=genre_name)
-            queryset = queryset.filter(genre_filter).distinct()
+            # EXISTS вместо JOIN + DISTINCT: фильм с любым из жанров (без учёта регистра)
+            genre_ids = (
+                Genre.objects.annotate(name_lower=Lower("name"))
+                .filter(name_lower__in=[name.lower() for name in genre_names])
+                .values("pk")
+            )
+            queryset = queryset.filter(
+                Exists(
+                    Movie.genres.through.objects.filter(
+                        movie_id=OuterRef("pk"), genre_id__in=genre_ids
+                    )
+                )
+            )
 
         if year and year.isdigit():
-             queryset = queryset.filter(release_date__year=int(year))
-
-        if sort_by == 'latest':
-            queryset = queryset.order_by('-created_at')
-        elif sort_by == 'upcoming':
-            queryset = queryset.filter(release_date__gt=date.today()).order_by('release_date')
-        elif sort_by == 'title':
-            queryset = queryset.order_by('title')
-        elif sort_by == 'release_date':
-             queryset = queryset.order_by('-release_date')
-        
+            # Диапазон по release_date, чтобы работал индекс
+            year = int(year)
+            if 1 <= year < 9999:
+                queryset = queryset.filter(
+                    release_date__gte=date(year, 1, 1),
+                    release_date__lt=date(year + 1, 1, 1),
+                )
+            else:
+                queryset = queryset.none()
+
+        if sort_by == 'upcoming':
+            queryset = queryset.filter(release_date__gt=date.today())
+        if sort_by in MOVIE_ORDERINGS:
+            queryset = queryset.order_by(*MOVIE_ORDERINGS[sort_by])
+
         return queryset
 
-class MovieDetailViewById(generics.RetrieveAPIView):
+class MovieDetailViewById(CachedResponseMixin, generics.RetrieveAPIView):
     serializer_class = MovieDetailSerializer
     lookup_field = "id"
 
+    def cache_namespaces(self):
+        return [f"movie:{self.kwargs['id']}", "genres"]
+
     def get_queryset(self):
-        return Movie.objects.all()
+        return Movie.objects.defer("search_vector").prefetch_related("genres")
 
 
 @permission_classes([IsAdminOrSuperUser])
@@ -84,6 +273,34 @@ class MovieCreateView(generics.CreateAPIView):
     queryset = Movie.objects.all()
 
 
+@permission_classes([IsAdminOrSuperUser])
+class MovieBulkCreateView(APIView):
+    """
+    Массовая загрузка фильмов: тело запроса - JSON Lines (application/x-ndjson)
+    или CSV (text/csv) с колонками title, release_date, genres. Тело читается
+    потоково, ответ - статистика загрузки и ошибки по номерам строк, включая
+    строки с битой кодировкой или разметкой CSV.
+    """
+
+    JSONL_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-lines")
+
+    def post(self, request):
+        content_type = request.content_type.split(";")[0].strip().lower()
+        if content_type not in CSV_CONTENT_TYPES + self.JSONL_CONTENT_TYPES:
+            return Response(
+                {"error": f"Unsupported content type: {content_type or 'none'}"},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        if request.stream is None:
+            return Response({"error": "Empty body"}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = ingest_movies(request.stream, content_type)
+        return Response(
+            result,
+            status=status.HTTP_201_CREATED if result["created"] else status.HTTP_400_BAD_REQUEST,
+        )
+
+
 @permission_classes([IsAdminOrSuperUser])
 class GenreCreateView(generics.CreateAPIView):
     queryset = Genre.objects.all()
@@ -94,15 +311,21 @@ class GenreDeleteView(generics.DestroyAPIView):
     queryset = Genre.objects.all()
     lookup_field = "pk"
 
-class GenreListView(generics.ListAPIView):
+class GenreListView(CachedResponseMixin, generics.ListAPIView):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
 
+    def cache_namespaces(self):
+        return ["genres"]
 
-class GenreDetailView(generics.RetrieveAPIView):
+
+class GenreDetailView(CachedResponseMixin, generics.RetrieveAPIView):
     serializer_class = GenreSerializer
     lookup_field = "name"
 
+    def cache_namespaces(self):
+        return ["genres"]
+
     def get_queryset(self):
         name = self.kwargs.get("name")
         return Genre.objects.filter(name__iexact=name)
@@ -120,3 +343,10 @@ class MovieUpdateView(generics.UpdateAPIView):
     serializer_class = MovieCreateSerializer
     lookup_field = "id"
 
+
+@permission_classes([IsAdminOrSuperUser])
+class HTTPClientStatsView(APIView):
+    """Метрики межсервисного HTTP-клиента текущего процесса по каждому upstream."""
+
+    def get(self, request):
+        return Response(http_client.stats())
@@ -41,7 +41,62 @@ CORS_ALLOWED_ORIGINS = os.getenv(
 
 USER_SERVICE_PRIVILEGES_URL = "http://user-service:8000/privileges/"
 
-USER_SERVICE_TIMEOUT = 10
+# Таймауты запросов к user-service: установка соединения и ожидание ответа (секунды)
+USER_SERVICE_CONNECT_TIMEOUT = float(os.getenv("USER_SERVICE_CONNECT_TIMEOUT", 0.5))
+USER_SERVICE_TIMEOUT = float(os.getenv("USER_SERVICE_TIMEOUT", 3))
+
+# Общий HTTP-клиент межсервисных запросов
+HTTP_CLIENT_POOL_SIZE = int(os.getenv("HTTP_CLIENT_POOL_SIZE", 20))
+HTTP_CLIENT_RETRIES = int(os.getenv("HTTP_CLIENT_RETRIES", 2))
+# Доля повторов от числа запросов за последние 10 секунд
+HTTP_CLIENT_RETRY_BUDGET_RATIO = float(os.getenv("HTTP_CLIENT_RETRY_BUDGET_RATIO", 0.1))
+# Ошибок подряд до размыкания и сколько секунд цепь остаётся разомкнутой
+HTTP_CLIENT_BREAKER_THRESHOLD = int(os.getenv("HTTP_CLIENT_BREAKER_THRESHOLD", 5))
+HTTP_CLIENT_BREAKER_RESET = int(os.getenv("HTTP_CLIENT_BREAKER_RESET", 10))
+
+# Кэш привилегий пользователей (секунды), отказы кэшируются на меньший срок
+PRIVILEGES_CACHE_TTL = int(os.getenv("PRIVILEGES_CACHE_TTL", 60))
+PRIVILEGES_CACHE_NEGATIVE_TTL = int(os.getenv("PRIVILEGES_CACHE_NEGATIVE_TTL", 10))
+PRIVILEGES_CACHE_MAX_SIZE = int(os.getenv("PRIVILEGES_CACHE_MAX_SIZE", 10000))
+# Алиас Django-кэша, общего для процессов (например, Redis). Пусто - только память процесса
+PRIVILEGES_CACHE_BACKEND = os.getenv("PRIVILEGES_CACHE_BACKEND") or None
+
+# Доверять правам из access-токена (is_staff, is_superuser, priv_ver) без запроса к user-service
+JWT_PRIVILEGE_CLAIMS = os.getenv("JWT_PRIVILEGE_CLAIMS", "False").lower() == "true"
+# Сколько секунд после выпуска токена права из него считаются свежими, 0 - всё время жизни токена
+PRIVILEGE_CLAIMS_MAX_AGE = int(os.getenv("PRIVILEGE_CLAIMS_MAX_AGE", 0))
+
+# JWKS user-service (например, http://user-service:8000/.well-known/jwks.json).
+# Если задан, токены проверяются публичными ключами по kid, иначе общим JWT_SECRET_KEY
+JWT_JWKS_URL = os.getenv("JWT_JWKS_URL", "")
+JWT_JWKS_REFRESH_INTERVAL = int(os.getenv("JWT_JWKS_REFRESH_INTERVAL", 300))
+# Не чаще этого внеочередное обновление JWKS при встрече неизвестного kid
+JWT_JWKS_MIN_REFRESH_INTERVAL = int(os.getenv("JWT_JWKS_MIN_REFRESH_INTERVAL", 30))
+# Сколько проверенных токенов помнить до истечения их срока
+JWT_VERIFIED_CACHE_SIZE = int(os.getenv("JWT_VERIFIED_CACHE_SIZE", 10000))
+
+# Конфигурация полнотекстового поиска PostgreSQL для названий фильмов
+CATALOG_SEARCH_CONFIG = os.getenv("CATALOG_SEARCH_CONFIG", "russian")
+
+# Кэш ответов каталога для анонимных запросов. По умолчанию locmem (в пределах
+# процесса), при нескольких воркерах задайте REDIS_URL, чтобы сброс кэша был общим
+REDIS_URL = os.getenv("REDIS_URL", "")
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+        if REDIS_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+CATALOG_RESPONSE_CACHE = "default"
+CATALOG_RESPONSE_CACHE_TTL = int(os.getenv("CATALOG_RESPONSE_CACHE_TTL", 300))
+
+# Массовая загрузка фильмов: строк в одной транзакции и сколько ошибок строк вернуть
+CATALOG_BULK_BATCH_SIZE = int(os.getenv("CATALOG_BULK_BATCH_SIZE", 1000))
+CATALOG_BULK_MAX_ERRORS = int(os.getenv("CATALOG_BULK_MAX_ERRORS", 1000))
 
 # Application definition
 
@@ -52,6 +107,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'api',
 ]
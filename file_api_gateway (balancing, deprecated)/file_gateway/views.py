@@ -1,9 +1,9 @@
 import os
-import requests
 from django.http import JsonResponse, HttpResponse
 from django.views import View
 from django.conf import settings
 from pathlib import Path
+from gateway.http_client import HTTP_CLIENT_CONNECT_TIMEOUT, http_client
 
 def get_file_servers():
     if not SERVERS_FILE.exists():
@@ -14,7 +14,7 @@ def get_file_servers():
 def server_has_movie(server_url, movie_id):
     url = f"{server_url}/movies/{movie_id}/"
     try:
-        response = requests.head(url, timeout=2)
+        response = http_client.head(url)
         return response.status_code == 200
     except:
         return False
@@ -23,7 +23,7 @@ def get_server_with_most_free_space(servers):
     results = []
     for server in servers:
         try:
-            resp = requests.get(f"{server}/health/", timeout=3)
+            resp = http_client.get(f"{server}/health/")
             if resp.status_code == 200:
                 data = resp.json()
                 free_space = data.get("free_space_mb", 0)
@@ -62,9 +62,11 @@ class ProxyView(View):
             headers["Authorization"] = auth_header
 
         try:
-            response = requests.request(
-                method=request.method,
-                url=target_url,
+            # Загрузка может идти долго, ограничиваем только установку соединения
+            response = http_client.request(
+                request.method,
+                target_url,
+                timeout=(HTTP_CLIENT_CONNECT_TIMEOUT, None),
                 headers=headers,
                 data=request.body,
                 params=request.GET,
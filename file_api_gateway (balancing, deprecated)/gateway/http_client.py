@@ -0,0 +1,248 @@
+# Одинаковая копия модуля лежит в каждом сервисе (catalog_service, file_service,
+# file_api_gateway): у сервисов отдельные контексты сборки Docker. Правки вносить во все копии.
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+HTTP_CLIENT_CONNECT_TIMEOUT = getattr(settings, "HTTP_CLIENT_CONNECT_TIMEOUT", 0.5)
+HTTP_CLIENT_READ_TIMEOUT = getattr(settings, "HTTP_CLIENT_READ_TIMEOUT", 3)
+HTTP_CLIENT_POOL_SIZE = getattr(settings, "HTTP_CLIENT_POOL_SIZE", 20)
+HTTP_CLIENT_RETRIES = getattr(settings, "HTTP_CLIENT_RETRIES", 2)
+HTTP_CLIENT_RETRY_BUDGET_RATIO = getattr(settings, "HTTP_CLIENT_RETRY_BUDGET_RATIO", 0.1)
+HTTP_CLIENT_RETRY_BUDGET_MIN = getattr(settings, "HTTP_CLIENT_RETRY_BUDGET_MIN", 10)
+HTTP_CLIENT_BREAKER_THRESHOLD = getattr(settings, "HTTP_CLIENT_BREAKER_THRESHOLD", 5)
+HTTP_CLIENT_BREAKER_RESET = getattr(settings, "HTTP_CLIENT_BREAKER_RESET", 10)
+# Считать ли ответы 5xx сбоями upstream (шлюз проксирует ответы файловых серверов как есть)
+HTTP_CLIENT_5XX_IS_FAILURE = getattr(settings, "HTTP_CLIENT_5XX_IS_FAILURE", True)
+
+# Повторять можно только запросы без побочных эффектов
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+RETRY_BUDGET_WINDOW = 10
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Upstream помечен недоступным, запрос не отправлялся."""
+
+
+class CircuitBreaker:
+    """
+    После threshold ошибок подряд размыкается на reset_timeout секунд,
+    затем пропускает один пробный запрос: успех замыкает цепь, ошибка снова размыкает.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self._trial = False
+            if self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record(self, success):
+        with self._lock:
+            if success:
+                self.state = "closed"
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """
+    Повторы не больше ratio от числа запросов за последние RETRY_BUDGET_WINDOW
+    секунд (плюс min_retries), чтобы повторы не умножали нагрузку на упавший сервис.
+    """
+
+    def __init__(self, ratio, min_retries):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self._requests.append(time.monotonic())
+
+    def try_spend(self):
+        with self._lock:
+            now = time.monotonic()
+            for events in (self._requests, self._retries):
+                while events and now - events[0] > RETRY_BUDGET_WINDOW:
+                    events.popleft()
+            if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+                return False
+            self._retries.append(now)
+            return True
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def snapshot(self):
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {"buckets": buckets, "count": self.count, "sum": round(self.total, 6)}
+
+
+class Upstream:
+    """Пул keep-alive соединений, предохранитель, бюджет повторов и метрики одного сервиса."""
+
+    def __init__(self, name):
+        self.name = name
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=HTTP_CLIENT_POOL_SIZE, max_retries=0
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.breaker = CircuitBreaker(HTTP_CLIENT_BREAKER_THRESHOLD, HTTP_CLIENT_BREAKER_RESET)
+        self.retry_budget = RetryBudget(HTTP_CLIENT_RETRY_BUDGET_RATIO, HTTP_CLIENT_RETRY_BUDGET_MIN)
+        self.latency = LatencyHistogram()
+        self.counters = {"requests": 0, "errors": 0, "retries": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            "latency": self.latency.snapshot(),
+        }
+
+
+class ServiceClient:
+    """
+    Общий HTTP-клиент для запросов между сервисами.
+
+    Для каждого upstream (схема, хост, порт) держится свой пул соединений.
+    Таймауты раздельные: (connect, read). Любые ошибки requests и ответы 5xx
+    (если HTTP_CLIENT_5XX_IS_FAILURE) считаются сбоями upstream и размыкают
+    предохранитель; идемпотентные запросы повторяются после ошибок соединения,
+    таймаутов и 5xx, пока позволяет бюджет повторов.
+    """
+
+    def __init__(self):
+        self._upstreams = {}
+        self._lock = threading.Lock()
+
+    def upstream(self, url):
+        parts = urlsplit(url)
+        name = f"{parts.scheme}://{parts.netloc}"
+        upstream = self._upstreams.get(name)
+        if upstream is None:
+            with self._lock:
+                upstream = self._upstreams.setdefault(name, Upstream(name))
+        return upstream
+
+    def request(self, method, url, retries=None, **kwargs):
+        method = method.upper()
+        upstream = self.upstream(url)
+        kwargs.setdefault("timeout", (HTTP_CLIENT_CONNECT_TIMEOUT, HTTP_CLIENT_READ_TIMEOUT))
+        if retries is None:
+            retries = HTTP_CLIENT_RETRIES if method in IDEMPOTENT_METHODS else 0
+
+        upstream.retry_budget.record_request()
+        attempt = 0
+        while True:
+            if not upstream.breaker.allow():
+                upstream.count("rejected")
+                raise CircuitOpenError(f"Circuit open for {upstream.name}")
+
+            upstream.count("requests")
+            started = time.monotonic()
+            response = error = None
+            try:
+                response = upstream.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            finally:
+                upstream.latency.observe(time.monotonic() - started)
+                # Каждая попытка должна закрыть пробный запрос предохранителя
+                failed = response is None or (
+                    HTTP_CLIENT_5XX_IS_FAILURE and response.status_code >= 500
+                )
+                upstream.breaker.record(not failed)
+            if not failed:
+                return response
+
+            upstream.count("errors")
+            retryable = response is not None or isinstance(
+                error, (requests.ConnectionError, requests.Timeout)
+            )
+            if not retryable or attempt >= retries or not upstream.retry_budget.try_spend():
+                if response is not None:
+                    return response
+                raise error
+
+            attempt += 1
+            upstream.count("retries")
+            logger.warning(
+                f"{method} {url} не удался (попытка {attempt}), повтор: "
+                f"{error if response is None else response.status_code}"
+            )
+            time.sleep(min(0.05 * 2 ** (attempt - 1), 1))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    def stats(self):
+        return {name: upstream.stats() for name, upstream in list(self._upstreams.items())}
+
+
+http_client = ServiceClient()
@@ -65,3 +65,6 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Ответы 5xx файловых серверов шлюз отдаёт клиенту как есть, предохранитель размыкают только сетевые ошибки
+HTTP_CLIENT_5XX_IS_FAILURE = False
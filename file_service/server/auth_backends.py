@@ -1,8 +1,16 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
 import requests
 from jose import jwt, JWTError
 from django.conf import settings
+from django.core.cache import caches
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
+from server.http_client import http_client
 
 SECRET_KEY = settings.JWT_SECRET_KEY
 JWT_ALGORITHM = getattr(settings, "JWT_ALGORITHM", "HS256")
@@ -12,7 +20,291 @@ USER_SERVICE_PRIVILEGES_URL = getattr(
 )
 AUTH_HEADER_PREFIX = getattr(settings, "AUTH_HEADER_PREFIX", "Bearer")
 
-USER_SERVICE_TIMEOUT = getattr(settings, "USER_SERVICE_TIMEOUT", 10)
+JWT_JWKS_URL = getattr(settings, "JWT_JWKS_URL", "")
+JWT_JWKS_REFRESH_INTERVAL = getattr(settings, "JWT_JWKS_REFRESH_INTERVAL", 300)
+JWT_JWKS_MIN_REFRESH_INTERVAL = getattr(settings, "JWT_JWKS_MIN_REFRESH_INTERVAL", 30)
+JWT_VERIFIED_CACHE_SIZE = getattr(settings, "JWT_VERIFIED_CACHE_SIZE", 10000)
+# Асимметричные алгоритмы, которые принимаются по JWKS
+JWKS_ALGORITHMS = ("RS256", "ES256")
+
+USER_SERVICE_CONNECT_TIMEOUT = getattr(settings, "USER_SERVICE_CONNECT_TIMEOUT", 0.5)
+USER_SERVICE_TIMEOUT = getattr(settings, "USER_SERVICE_TIMEOUT", 3)
+
+PRIVILEGES_CACHE_TTL = getattr(settings, "PRIVILEGES_CACHE_TTL", 60)
+PRIVILEGES_CACHE_NEGATIVE_TTL = getattr(settings, "PRIVILEGES_CACHE_NEGATIVE_TTL", 10)
+PRIVILEGES_CACHE_MAX_SIZE = getattr(settings, "PRIVILEGES_CACHE_MAX_SIZE", 10000)
+PRIVILEGES_CACHE_BACKEND = getattr(settings, "PRIVILEGES_CACHE_BACKEND", None)
+
+JWT_PRIVILEGE_CLAIMS = getattr(settings, "JWT_PRIVILEGE_CLAIMS", False)
+PRIVILEGE_CLAIMS_MAX_AGE = getattr(settings, "PRIVILEGE_CLAIMS_MAX_AGE", 0)
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSKeyCache:
+    """
+    Ключи проверки JWT из JWKS user-service, индексированные по kid.
+
+    Набор ключей обновляется в фоновом потоке раз в refresh_interval секунд,
+    поэтому запросы не ходят за ключами. Неизвестный kid (новый ключ после
+    ротации) вызывает внеочередное обновление не чаще min_refresh_interval.
+    """
+
+    def __init__(self, url, refresh_interval, min_refresh_interval, timeout):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._thread = None
+
+    def get(self, kid):
+        self._ensure_started()
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._last_refresh >= self.min_refresh_interval:
+            self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    def refresh(self):
+        with self._refresh_lock:
+            self._last_refresh = time.monotonic()
+            try:
+                response = http_client.get(self.url, timeout=self.timeout)
+                response.raise_for_status()
+                keys = {
+                    key["kid"]: key
+                    for key in response.json().get("keys", [])
+                    if key.get("kid") and key.get("alg") in JWKS_ALGORITHMS
+                }
+            except (requests.RequestException, ValueError) as e:
+                # Старые ключи остаются в силе до следующей удачной загрузки
+                logger.error(f"Не удалось обновить JWKS {self.url}: {e}")
+                return
+            if set(keys) != set(self._keys):
+                logger.info(f"Ключи JWKS обновлены: {sorted(keys)}")
+            self._keys = keys
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.refresh()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            self.refresh()
+
+
+class VerifiedTokenCache:
+    """LRU проверенных токенов: повторная проверка подписи не нужна до истечения exp."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            payload = self._entries.get(token)
+            if payload is None:
+                return None
+            if payload.get("exp", 0) <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return payload
+
+    def put(self, token, payload):
+        if not self.max_size or "exp" not in payload:
+            return
+        with self._lock:
+            self._entries[token] = payload
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+jwks_cache = (
+    JWKSKeyCache(
+        JWT_JWKS_URL,
+        JWT_JWKS_REFRESH_INTERVAL,
+        JWT_JWKS_MIN_REFRESH_INTERVAL,
+        (USER_SERVICE_CONNECT_TIMEOUT, USER_SERVICE_TIMEOUT),
+    )
+    if JWT_JWKS_URL
+    else None
+)
+verified_tokens = VerifiedTokenCache(JWT_VERIFIED_CACHE_SIZE)
+
+
+def decode_token(token):
+    """Проверяет подпись и срок токена. Бросает JWTError."""
+    payload = verified_tokens.get(token)
+    if payload is not None:
+        return payload
+
+    if jwks_cache is not None:
+        header = jwt.get_unverified_header(token)
+        key = jwks_cache.get(header.get("kid"))
+        if key is None:
+            raise JWTError("Unknown signing key.")
+        payload = jwt.decode(token, key, algorithms=[key["alg"]])
+    else:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
+
+    verified_tokens.put(token, payload)
+    return payload
+
+
+class PrivilegesDenied(AuthenticationFailed):
+    """Отказ user-service, который можно кэшировать (в отличие от недоступности сервиса)."""
+
+
+class _InflightRequest:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class PrivilegesCache:
+    """
+    TTL/LRU-кэш привилегий в памяти процесса, ключ - (user_id, jti).
+
+    Одновременные промахи по одному ключу ждут единственный запрос к user-service.
+    Отказы кэшируются на negative_ttl. Если задан backend (алиас Django-кэша),
+    записи дополнительно хранятся в нём и видны всем процессам.
+    """
+
+    def __init__(self, ttl, negative_ttl, max_size, backend=None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.backend = backend
+
+        self._entries = OrderedDict()
+        self._versions = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, jti, fetch, expires_at=None):
+        """
+        Возвращает привилегии из кэша или вызывает fetch().
+        fetch должен вернуть словарь привилегий или бросить PrivilegesDenied.
+        """
+        key = (user_id, jti)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                request = self._inflight.get(key)
+                leader = request is None
+                if leader:
+                    request = self._inflight[key] = _InflightRequest()
+
+        if entry is not None:
+            return self._unwrap(entry)
+
+        if not leader:
+            request.event.wait()
+            if request.error is not None:
+                raise request.error
+            return self._unwrap(request.result)
+
+        try:
+            request.result = self._load(key, fetch, expires_at)
+        except Exception as e:
+            request.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            request.event.set()
+        return self._unwrap(request.result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def note_version(self, user_id, version):
+        """Запоминает самую новую виденную версию прав пользователя."""
+        with self._lock:
+            if version > self._versions.get(user_id, -1):
+                self._versions[user_id] = version
+            self._versions.move_to_end(user_id)
+            while len(self._versions) > self.max_size:
+                self._versions.popitem(last=False)
+
+    def is_stale(self, user_id, version):
+        with self._lock:
+            return version < self._versions.get(user_id, -1)
+
+    def _load(self, key, fetch, expires_at):
+        shared_key = f"privileges:{key[0]}:{key[1]}"
+        shared = caches[self.backend] if self.backend else None
+        if shared is not None:
+            entry = shared.get(shared_key)
+            if entry is not None:
+                self._store(key, entry)
+                return entry
+
+        try:
+            entry = ("ok", fetch(), self.ttl)
+        except PrivilegesDenied as e:
+            entry = ("denied", e.detail, self.negative_ttl)
+
+        expires = time.time() + entry[2]
+        if expires_at:
+            # Привилегии не переживают сам токен
+            expires = min(expires, expires_at)
+        entry = (entry[0], entry[1], expires)
+        if expires > time.time():
+            self._store(key, entry)
+            if shared is not None:
+                shared.set(shared_key, entry, timeout=max(1, int(expires - time.time())))
+        return entry
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _unwrap(entry):
+        status, value, _ = entry
+        if status == "denied":
+            raise PrivilegesDenied(value)
+        return value
+
+
+privileges_cache = PrivilegesCache(
+    ttl=PRIVILEGES_CACHE_TTL,
+    negative_ttl=PRIVILEGES_CACHE_NEGATIVE_TTL,
+    max_size=PRIVILEGES_CACHE_MAX_SIZE,
+    backend=PRIVILEGES_CACHE_BACKEND,
+)
 
 
 class ExternalUser:
@@ -42,6 +334,7 @@ class ExternalJWTAuthentication(BaseAuthentication):
     """
     Кастомный бэкенд аутентификации для DRF.
     Проверяет JWT токен, декодирует его локально, затем запрашивает привилегии у user-service.
+    При JWT_PRIVILEGE_CLAIMS свежие права берутся прямо из токена.
     """
 
     def authenticate(self, request):
@@ -60,10 +353,10 @@ class ExternalJWTAuthentication(BaseAuthentication):
 
         try:
 
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
+            payload = decode_token(token)
         except jwt.ExpiredSignatureError:
             raise AuthenticationFailed("Token has expired.")
-        except jwt.InvalidTokenError as e:
+        except JWTError as e:
             raise AuthenticationFailed(f"Invalid token: {str(e)}")
 
         user_id_from_token = payload.get("user_id")
@@ -81,18 +374,75 @@ class ExternalJWTAuthentication(BaseAuthentication):
             "email": email_from_token,
         }
 
+        claims_privileges = self.privileges_from_claims(payload)
+        if claims_privileges is not None:
+            return (ExternalUser(token_user_data, claims_privileges), token)
+
+        # jti есть у токенов simplejwt; для прочих ключом служит хэш самого токена
+        jti = payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+        privileges_data = privileges_cache.get(
+            user_id_from_token,
+            jti,
+            lambda: self.fetch_privileges(token),
+            expires_at=payload.get("exp"),
+        )
+        if "privileges_version" in privileges_data:
+            privileges_cache.note_version(
+                user_id_from_token, privileges_data["privileges_version"]
+            )
+
+        user = ExternalUser(token_user_data, privileges_data)
+
+        return (user, token)
+
+    def privileges_from_claims(self, payload):
+        """
+        Права из access-токена, если они там есть и не устарели: версия не ниже
+        последней известной для пользователя и токен не старше PRIVILEGE_CLAIMS_MAX_AGE.
+        Иначе None, и права запрашиваются у user-service.
+        """
+        if not JWT_PRIVILEGE_CLAIMS:
+            return None
+        version = payload.get("priv_ver")
+        if (
+            not isinstance(version, int)
+            or "is_staff" not in payload
+            or "is_superuser" not in payload
+        ):
+            return None
+
+        user_id = payload["user_id"]
+        if PRIVILEGE_CLAIMS_MAX_AGE and time.time() - payload.get("iat", 0) > PRIVILEGE_CLAIMS_MAX_AGE:
+            return None
+        if privileges_cache.is_stale(user_id, version):
+            return None
+        privileges_cache.note_version(user_id, version)
+
+        return {
+            "is_staff": bool(payload["is_staff"]),
+            "is_superuser": bool(payload["is_superuser"]),
+            "privileges_version": version,
+        }
+
+    def fetch_privileges(self, token):
         headers = {"Authorization": f"{AUTH_HEADER_PREFIX} {token}"}
         try:
 
-            response = requests.get(
+            response = http_client.get(
                 USER_SERVICE_PRIVILEGES_URL,
                 headers=headers,
-                timeout=USER_SERVICE_TIMEOUT,
+                timeout=(USER_SERVICE_CONNECT_TIMEOUT, USER_SERVICE_TIMEOUT),
             )
         except requests.RequestException as e:
 
             raise AuthenticationFailed(f"User service is unreachable: {str(e)}")
 
+        if response.status_code in (401, 403, 404):
+
+            raise PrivilegesDenied(
+                f"Access denied by user service. Status: {response.status_code}"
+            )
+
         if response.status_code != 200:
 
             raise AuthenticationFailed(
@@ -105,13 +455,12 @@ class ExternalJWTAuthentication(BaseAuthentication):
             raise AuthenticationFailed("Invalid JSON response from user service.")
 
         if "is_staff" not in privileges_data or "is_superuser" not in privileges_data:
+
             raise AuthenticationFailed(
                 "User service response missing is_staff/is_superuser fields."
             )
 
-        user = ExternalUser(token_user_data, privileges_data)
-
-        return (user, token)
+        return privileges_data
 
     def authenticate_header(self, request):
         return AUTH_HEADER_PREFIX
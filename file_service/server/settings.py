@@ -8,11 +8,41 @@ from pathlib import Path
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-FILE_UPLOAD_MAX_MEMORY_SIZE = 0
-
 USER_SERVICE_PRIVILEGES_URL = "http://user-service:8000/privileges/"
 
-USER_SERVICE_TIMEOUT = 10
+# Таймауты запросов к user-service: установка соединения и ожидание ответа (секунды)
+USER_SERVICE_CONNECT_TIMEOUT = float(os.getenv("USER_SERVICE_CONNECT_TIMEOUT", 0.5))
+USER_SERVICE_TIMEOUT = float(os.getenv("USER_SERVICE_TIMEOUT", 3))
+
+# Общий HTTP-клиент межсервисных запросов
+HTTP_CLIENT_POOL_SIZE = int(os.getenv("HTTP_CLIENT_POOL_SIZE", 20))
+HTTP_CLIENT_RETRIES = int(os.getenv("HTTP_CLIENT_RETRIES", 2))
+# Доля повторов от числа запросов за последние 10 секунд
+HTTP_CLIENT_RETRY_BUDGET_RATIO = float(os.getenv("HTTP_CLIENT_RETRY_BUDGET_RATIO", 0.1))
+# Ошибок подряд до размыкания и сколько секунд цепь остаётся разомкнутой
+HTTP_CLIENT_BREAKER_THRESHOLD = int(os.getenv("HTTP_CLIENT_BREAKER_THRESHOLD", 5))
+HTTP_CLIENT_BREAKER_RESET = int(os.getenv("HTTP_CLIENT_BREAKER_RESET", 10))
+
+# Кэш привилегий пользователей (секунды), отказы кэшируются на меньший срок
+PRIVILEGES_CACHE_TTL = int(os.getenv("PRIVILEGES_CACHE_TTL", 60))
+PRIVILEGES_CACHE_NEGATIVE_TTL = int(os.getenv("PRIVILEGES_CACHE_NEGATIVE_TTL", 10))
+PRIVILEGES_CACHE_MAX_SIZE = int(os.getenv("PRIVILEGES_CACHE_MAX_SIZE", 10000))
+# Алиас Django-кэша, общего для процессов (например, Redis). Пусто - только память процесса
+PRIVILEGES_CACHE_BACKEND = os.getenv("PRIVILEGES_CACHE_BACKEND") or None
+
+# Доверять правам из access-токена (is_staff, is_superuser, priv_ver) без запроса к user-service
+JWT_PRIVILEGE_CLAIMS = os.getenv("JWT_PRIVILEGE_CLAIMS", "False").lower() == "true"
+# Сколько секунд после выпуска токена права из него считаются свежими, 0 - всё время жизни токена
+PRIVILEGE_CLAIMS_MAX_AGE = int(os.getenv("PRIVILEGE_CLAIMS_MAX_AGE", 0))
+
+# JWKS user-service (например, http://user-service:8000/.well-known/jwks.json).
+# Если задан, токены проверяются публичными ключами по kid, иначе общим JWT_SECRET_KEY
+JWT_JWKS_URL = os.getenv("JWT_JWKS_URL", "")
+JWT_JWKS_REFRESH_INTERVAL = int(os.getenv("JWT_JWKS_REFRESH_INTERVAL", 300))
+# Не чаще этого внеочередное обновление JWKS при встрече неизвестного kid
+JWT_JWKS_MIN_REFRESH_INTERVAL = int(os.getenv("JWT_JWKS_MIN_REFRESH_INTERVAL", 30))
+# Сколько проверенных токенов помнить до истечения их срока
+JWT_VERIFIED_CACHE_SIZE = int(os.getenv("JWT_VERIFIED_CACHE_SIZE", 10000))
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', 'backup_no_so_secret_key_@342FD-sfd_32q##424%234##33(32432@&^hvdr')
@@ -70,9 +100,34 @@ FTP_SERVER_USER = os.getenv('FTP_USER_NAME', 'default_user')
 FTP_SERVER_PASSWORD = os.getenv('FTP_USER_PASS', 'default_pass')
 FTP_STORAGE_LOCATION = '/media'
 
+# Пул FTP-соединений (на процесс gunicorn)
+FTP_POOL_MAX_SIZE = int(os.getenv("FTP_POOL_MAX_SIZE", 4))
+FTP_POOL_MAX_IDLE_TIME = int(os.getenv("FTP_POOL_MAX_IDLE_TIME", 60))
+FTP_POOL_HEALTH_CHECK_AFTER = int(os.getenv("FTP_POOL_HEALTH_CHECK_AFTER", 5))
+FTP_POOL_ACQUIRE_TIMEOUT = int(os.getenv("FTP_POOL_ACQUIRE_TIMEOUT", 30))
+
+# Сколько DELE отправлять без ожидания ответа (1 - без конвейера)
+FTP_DELETE_PIPELINE_DEPTH = int(os.getenv("FTP_DELETE_PIPELINE_DEPTH", 32))
+
+# Фоновые задачи удаления
+DELETION_JOB_WORKERS = int(os.getenv("DELETION_JOB_WORKERS", 4))
+DELETION_JOB_CACHE = "default"
+DELETION_JOB_TTL = int(os.getenv("DELETION_JOB_TTL", 60 * 60 * 24))
+
+# Файловый кэш общий для всех воркеров gunicorn в контейнере
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("FILE_SERVICE_CACHE_DIR", "/tmp/file_service_cache"),
+    }
+}
+
 # URL для доступа к файлам
 FILE_SERVER_URL = os.getenv("FILE_SERVER_URL", "ftp://ftp-server/media/movies")
 
+# Время жизни upload_id возобновляемой загрузки (секунды)
+CHUNKED_UPLOAD_MAX_AGE = int(os.getenv("CHUNKED_UPLOAD_MAX_AGE", 60 * 60 * 24 * 7))
+
 
 # RabbitMQ
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
@@ -80,9 +135,13 @@ RABBITMQ_PORT = os.getenv("RABBITMQ_PORT", 5672)
 RABBITMQ_DEFAULT_USER = os.getenv("RABBITMQ_DEFAULT_USER", "guest")
 RABBITMQ_DEFAULT_PASS = os.getenv("RABBITMQ_DEFAULT_PASS", "guest")
 RABBITMQ_QUEUE = os.getenv("RABBITMQ_QUEUE", "video_uploads")
+# Fanout-обменник событий "путь на FTP изменился" для ftp-mirror-proxy (пусто - не отправлять)
+MIRROR_EVENTS_EXCHANGE = os.getenv("MIRROR_EVENTS_EXCHANGE", "mirror_events")
 
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760000
 
+# Файлы фильмов пишутся напрямую в FTP через FTPStreamingUploadHandler,
+# лимит относится только к прочим multipart-полям
 FILE_UPLOAD_MAX_MEMORY_SIZE = 104857600
 
 LANGUAGE_CODE = 'en-us'
@@ -16,13 +16,31 @@ Including another URLconf
 """
 
 from django.urls import path
-from uploader.views import UploadFileView, DeleteFileView, DeleteAllMovieFilesView
+from uploader.views import (
+    UploadFileView,
+    DeleteFileView,
+    DeleteAllMovieFilesView,
+    ChunkedUploadBeginView,
+    ChunkedUploadChunkView,
+    ChunkedUploadCommitView,
+    FTPPoolStatsView,
+    HTTPClientStatsView,
+    BulkDeleteMovieFilesView,
+    DeletionJobStatusView,
+)
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
     path('upload/<int:movie_id>/<str:content_type>/', UploadFileView.as_view(), name='upload'),
+    path('upload/<int:movie_id>/<str:content_type>/begin/', ChunkedUploadBeginView.as_view(), name='upload-begin'),
+    path('upload/<int:movie_id>/<str:content_type>/<str:upload_id>/', ChunkedUploadChunkView.as_view(), name='upload-chunk'),
+    path('upload/<int:movie_id>/<str:content_type>/<str:upload_id>/commit/', ChunkedUploadCommitView.as_view(), name='upload-commit'),
     path('delete/<int:movie_id>/<str:content_type>/', DeleteFileView.as_view(), name='delete'),
     path('delete/<int:movie_id>/', DeleteAllMovieFilesView.as_view(), name='delete-all'),
+    path('delete/bulk/', BulkDeleteMovieFilesView.as_view(), name='delete-bulk'),
+    path('delete/jobs/<str:job_id>/', DeletionJobStatusView.as_view(), name='delete-job'),
+    path('ftp-pool/stats/', FTPPoolStatsView.as_view(), name='ftp-pool-stats'),
+    path('http-client/stats/', HTTPClientStatsView.as_view(), name='http-client-stats'),
     # path('health/', health, name='health'),
 ]
\ No newline at end of file
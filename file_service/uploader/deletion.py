@@ -0,0 +1,203 @@
+import ftplib
+import logging
+import posixpath
+from server import settings
+from uploader.ftp_pool import ftp_pool
+from uploader.ftp_utils import ALLOWED_FORMATS, movie_dir
+
+logger = logging.getLogger(__name__)
+
+
+# Ответ 500/502/504 на MLSD - сервер не поддерживает команду,
+# 501 - не принимает её с аргументом-путём
+MLSD_UNSUPPORTED_CODES = ("500", "501", "502", "504")
+
+
+class MovieFilesDeleter:
+    """
+    Удаление файлов фильма за одну FTP-сессию.
+
+    Папка movies/<id> и её transcoded листятся по одному разу (MLSD, если сервер
+    поддерживает), набор файлов на удаление считается в памяти, а DELE
+    отправляются пачками по pipeline_depth команд без ожидания ответа на каждую.
+    """
+
+    def __init__(self, ftp, movie_id, pipeline_depth=None):
+        self.ftp = ftp
+        self.movie_id = movie_id
+        self.base_path = movie_dir(movie_id)
+        self.transcoded_dir = f"{self.base_path}/transcoded"
+        self.pipeline_depth = max(
+            1, pipeline_depth or settings.FTP_DELETE_PIPELINE_DEPTH
+        )
+        self.files_removed = 0
+        self.bytes_freed = 0
+        self._mlsd_supported = True
+        self._base_listing = None
+        self._transcoded_listing = None
+
+    def delete(self, file_types, remove_folder=False, on_progress=None):
+        """
+        Удаляет файлы указанных типов ('m', 'p', 't').
+        Возвращает (results, folder_deleted), где results - словарь по типам:
+        для 'm' - число удалённых файлов, для 'p' и 't' - удалён ли хоть один файл.
+        """
+        self._base_listing = self._list(self.base_path)
+        self._transcoded_listing = {}
+        base_exists = self._base_listing is not None
+        if not base_exists:
+            logger.info(f"Папка фильма {self.base_path} не существует на FTP.")
+            self._base_listing = {}
+        elif "transcoded" in self._base_listing:
+            self._transcoded_listing = self._list(self.transcoded_dir) or {}
+
+        results = {}
+        for file_type in file_types:
+            paths = self._plan(file_type)
+            logger.info(
+                f"Удаление файлов типа '{file_type}' для movie_id={self.movie_id}: {len(paths)} шт."
+            )
+            deleted = self._delete_paths(paths, on_progress)
+            results[file_type] = len(deleted) if file_type == "m" else bool(deleted)
+
+        if self._transcoded_listing == {} and "transcoded" in self._base_listing:
+            if self._rmdir(self.transcoded_dir):
+                del self._base_listing["transcoded"]
+
+        folder_deleted = False
+        if remove_folder:
+            if not base_exists:
+                folder_deleted = True
+            elif self._base_listing:
+                logger.warning(
+                    f"Папка фильма {self.base_path} не пуста. Удаление невозможно. "
+                    f"Оставшиеся элементы: {sorted(self._base_listing)}"
+                )
+            else:
+                folder_deleted = self._rmdir(self.base_path)
+
+        return results, folder_deleted
+
+    def _plan(self, file_type):
+        names = [f"{file_type}{ext}" for ext in ALLOWED_FORMATS.get(file_type, [])]
+        paths = [
+            f"{self.base_path}/{name}"
+            for name, facts in self._base_listing.items()
+            if facts["type"] == "file"
+            and (name in names or self._is_partial_upload(name, file_type))
+        ]
+        if file_type == "m":
+            paths += [
+                f"{self.transcoded_dir}/{name}"
+                for name, facts in self._transcoded_listing.items()
+                if facts["type"] == "file" and name.startswith("m")
+            ]
+        return paths
+
+    @staticmethod
+    def _is_partial_upload(name, file_type):
+        # Незавершённые возобновляемые загрузки: .<тип>.<nonce><ext>.part
+        return name.startswith(f".{file_type}.") and name.endswith(".part")
+
+    def _list(self, path):
+        """
+        Возвращает {имя: {"type", "size"}} или None, если папки нет.
+        Отказ в листинге существующей папки (нет прав) пробрасывается.
+        """
+        if self._mlsd_supported:
+            try:
+                return {
+                    name: {
+                        "type": facts.get("type", "file"),
+                        "size": int(facts["size"]) if "size" in facts else None,
+                    }
+                    for name, facts in self.ftp.mlsd(path, facts=["type", "size"])
+                    if facts.get("type", "file") in ("file", "dir")
+                }
+            except ftplib.error_perm as e:
+                if not str(e).startswith(MLSD_UNSUPPORTED_CODES):
+                    if self._dir_exists(path):
+                        raise
+                    return None
+                logger.info("FTP-сервер не поддерживает MLSD, используется NLST")
+                self._mlsd_supported = False
+
+        try:
+            names = [posixpath.basename(name) for name in self.ftp.nlst(path)]
+        except (ftplib.error_perm, ftplib.error_temp):
+            # Часть серверов отвечает на NLST пустой или отсутствующей папки 450
+            return {} if self._dir_exists(path) else None
+        return {
+            name: {"type": "dir" if name == "transcoded" else "file", "size": None}
+            for name in names
+            if name not in (".", "..")
+        }
+
+    def _dir_exists(self, path):
+        """Проверяет существование папки переходом в неё (ответ 550 на CWD - папки нет)."""
+        cwd = self.ftp.pwd()
+        try:
+            self.ftp.cwd(path)
+        except ftplib.error_perm as e:
+            if str(e).startswith("550"):
+                return False
+            raise
+        self.ftp.cwd(cwd)
+        return True
+
+    def _delete_paths(self, paths, on_progress=None):
+        deleted = []
+        for start in range(0, len(paths), self.pipeline_depth):
+            batch = [
+                p
+                for p in paths[start : start + self.pipeline_depth]
+                if "\r" not in p and "\n" not in p
+            ]
+            if not batch:
+                continue
+            if len(batch) == 1:
+                self.ftp.putcmd(f"DELE {batch[0]}")
+            else:
+                self.ftp.sock.sendall(
+                    "".join(f"DELE {p}\r\n" for p in batch).encode(self.ftp.encoding)
+                )
+            for path in batch:
+                try:
+                    self.ftp.voidresp()
+                except (ftplib.error_perm, ftplib.error_temp) as e:
+                    logger.warning(f"Не удалось удалить файл {path}: {e}")
+                    continue
+                logger.debug(f"Удален файл: {path}")
+                deleted.append(path)
+                self._forget(path)
+            if on_progress:
+                on_progress(self.files_removed, self.bytes_freed)
+        return deleted
+
+    def _forget(self, path):
+        directory, name = posixpath.split(path)
+        listing = (
+            self._transcoded_listing
+            if directory == self.transcoded_dir
+            else self._base_listing
+        )
+        facts = listing.pop(name, None) or {}
+        self.files_removed += 1
+        self.bytes_freed += facts.get("size") or 0
+
+    def _rmdir(self, path):
+        try:
+            self.ftp.rmd(path)
+        except (ftplib.error_perm, ftplib.error_temp) as e:
+            logger.warning(f"Не удалось удалить папку {path}: {e}")
+            return False
+        logger.info(f"Удалена папка: {path}")
+        return True
+
+
+def delete_movie_files(movie_id, file_types, remove_folder=False, on_progress=None):
+    """Удаляет файлы нескольких типов за одну сессию. Возвращает (results, folder_deleted)."""
+    with ftp_pool.connection() as ftp:
+        return MovieFilesDeleter(ftp, movie_id).delete(
+            file_types, remove_folder=remove_folder, on_progress=on_progress
+        )
@@ -0,0 +1,203 @@
+import ftplib
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from server import settings
+from uploader.ftp_utils import connect_ftp
+
+logger = logging.getLogger(__name__)
+
+
+class FTPPoolTimeout(Exception):
+    pass
+
+
+class FTPConnectionPool:
+    """
+    Потокобезопасный пул авторизованных управляющих FTP-соединений.
+
+    Соединение, простоявшее дольше health_check_after секунд, перед выдачей
+    проверяется командой NOOP и при ошибке переоткрывается. Соединения,
+    простоявшие дольше max_idle_time, закрываются. Одновременно открыто
+    не больше max_size соединений, остальные ждут освобождения до acquire_timeout.
+    """
+
+    def __init__(
+        self,
+        factory,
+        max_size=4,
+        max_idle_time=60,
+        health_check_after=5,
+        acquire_timeout=30,
+    ):
+        self.factory = factory
+        self.max_size = max_size
+        self.max_idle_time = max_idle_time
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._reconnects = 0
+        self._evictions = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def acquire(self):
+        started = time.monotonic()
+        waited = False
+        timed_out = False
+        conn = None
+        expired = []
+
+        with self._cond:
+            while True:
+                expired.extend(self._evict_idle())
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    self._hits += 1
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    self._misses += 1
+                    break
+
+                remaining = self.acquire_timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    timed_out = True
+                    break
+                waited = True
+                self._cond.wait(remaining)
+
+            if waited:
+                wait_time = time.monotonic() - started
+                self._waits += 1
+                self._wait_time_total += wait_time
+                self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        self._close_many(expired)
+        if timed_out:
+            raise FTPPoolTimeout(
+                f"Нет свободных FTP-соединений за {self.acquire_timeout} с"
+            )
+
+        if conn is not None:
+            if time.monotonic() - last_used < self.health_check_after:
+                return conn
+            try:
+                conn.voidcmd("NOOP")
+                return conn
+            except Exception as e:
+                logger.info(f"FTP-соединение из пула не прошло NOOP, переподключение: {e}")
+                self._close(conn)
+                with self._cond:
+                    self._reconnects += 1
+
+        try:
+            return self.factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn, broken=False):
+        if broken:
+            self._close(conn)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Выдаёт соединение из пула. Если внутри блока возникла ошибка,
+        отличная от постоянной ошибки команды (ответ 5xx),
+        соединение считается испорченным и закрывается.
+        """
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except ftplib.error_perm:
+            raise
+        except BaseException:
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "hits": self._hits,
+                "misses": self._misses,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "reconnects": self._reconnects,
+                "evictions": self._evictions,
+                "wait_time_total": round(self._wait_time_total, 6),
+                "wait_time_max": round(self._wait_time_max, 6),
+            }
+
+    def close_all(self):
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        self._close_many(conn for conn, _ in idle)
+
+    def _evict_idle(self):
+        """Снимает с учёта просроченные соединения, закрывать их нужно вне блокировки."""
+        # Самые старые соединения лежат в начале очереди
+        expired = []
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.max_idle_time:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._evictions += 1
+            expired.append(conn)
+        if expired:
+            self._cond.notify(len(expired))
+        return expired
+
+    def _close_many(self, conns):
+        for conn in conns:
+            self._close(conn)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+
+ftp_pool = FTPConnectionPool(
+    connect_ftp,
+    max_size=settings.FTP_POOL_MAX_SIZE,
+    max_idle_time=settings.FTP_POOL_MAX_IDLE_TIME,
+    health_check_after=settings.FTP_POOL_HEALTH_CHECK_AFTER,
+    acquire_timeout=settings.FTP_POOL_ACQUIRE_TIMEOUT,
+)
+
@@ -0,0 +1,81 @@
+import os
+import ftplib
+import logging
+from ftplib import FTP
+from server import settings
+
+logger = logging.getLogger(__name__)
+
+
+FILE_MAP = {"film": "m", "poster": "p", "trailer": "t"}
+
+ALLOWED_FORMATS = {
+    "m": [".mp4", ".mkv", ".avi"],
+    "t": [".mp4", ".mov", ".webm"],
+    "p": [".jpg", ".jpeg", ".png"],
+}
+
+
+def movie_dir(movie_id):
+    return f"{settings.FTP_STORAGE_LOCATION}/movies/{movie_id}"
+
+
+def validate_upload(content_type, file_name):
+    """
+    Проверяет content_type и расширение файла.
+    Возвращает (filename, ext, error), где error - текст ошибки или None.
+    """
+    if content_type not in FILE_MAP:
+        return None, None, "Invalid content_type"
+
+    ext = os.path.splitext(file_name or "")[1].lower()
+    filename = FILE_MAP[content_type]
+    if ext not in ALLOWED_FORMATS[filename]:
+        return (
+            filename,
+            ext,
+            f'Invalid file format for {content_type}. Allowed formats: {", ".join(ALLOWED_FORMATS[filename])}',
+        )
+    return filename, ext, None
+
+
+def connect_ftp():
+    """Открывает новое авторизованное FTP-соединение в пассивном режиме."""
+    ftp = FTP()
+    logger.debug(
+        f"Подключение к FTP {settings.FTP_SERVER_HOST}:{settings.FTP_SERVER_PORT}..."
+    )
+    ftp.connect(settings.FTP_SERVER_HOST, settings.FTP_SERVER_PORT)
+    ftp.set_pasv(True)
+    ftp.login(settings.FTP_SERVER_USER, settings.FTP_SERVER_PASSWORD)
+    logger.debug("Успешное подключение к FTP")
+    return ftp
+
+
+def ensure_ftp_dir(ftp, path):
+    directories = path.strip("/").split("/")
+    current = ""
+    for dir in directories:
+        if not dir:
+            continue
+        current += "/" + dir
+        try:
+            ftp.cwd(current)
+            logger.debug(f"Директория существует: {current}")
+        except ftplib.error_perm:
+            logger.debug(f"Создание директории: {current}")
+            ftp.mkd(current)
+            ftp.cwd(current)
+            logger.debug(f"Директория создана и выбрана: {current}")
+        except Exception as e:
+            logger.error(f"Неожиданная ошибка при работе с директорией {current}: {e}")
+            raise
+
+
+def remote_size(ftp, path):
+    """Возвращает размер файла на FTP или None, если файла нет."""
+    ftp.voidcmd("TYPE I")
+    try:
+        return ftp.size(path)
+    except ftplib.error_perm:
+        return None
@@ -0,0 +1,106 @@
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.core.cache import caches
+from server import settings
+from uploader.deletion import delete_movie_files
+from uploader.ftp_utils import movie_dir
+from uploader.mirror_events import publish_path_changed
+
+logger = logging.getLogger(__name__)
+
+
+JOB_KEY = "deletion_job:{}"
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.DELETION_JOB_WORKERS, thread_name_prefix="deletion-job"
+)
+
+
+def _cache():
+    return caches[settings.DELETION_JOB_CACHE]
+
+
+def _save(job):
+    _cache().set(JOB_KEY.format(job["id"]), job, settings.DELETION_JOB_TTL)
+
+
+def get_deletion_job(job_id):
+    return _cache().get(JOB_KEY.format(job_id))
+
+
+def start_deletion_job(movie_id, file_types, remove_folder=False):
+    """
+    Ставит удаление файлов фильма в фоновый пул потоков.
+    Состояние задачи хранится в кэше Django, чтобы статус можно было
+    запросить из любого воркера gunicorn.
+    """
+    job = {
+        "id": uuid.uuid4().hex,
+        "movie_id": movie_id,
+        "file_types": list(file_types),
+        "remove_folder": remove_folder,
+        "status": "queued",
+        "files_removed": 0,
+        "bytes_freed": 0,
+        "results": None,
+        "folder_deleted": None,
+        "success": None,
+        "error": None,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+    }
+    _save(job)
+    _executor.submit(_run_deletion_job, dict(job))
+    logger.info(
+        f"Задача удаления {job['id']} поставлена в очередь: movie_id={movie_id}, типы={file_types}"
+    )
+    return job
+
+
+def _run_deletion_job(job):
+    job.update(status="running", started_at=time.time())
+    _save(job)
+
+    def on_progress(files_removed, bytes_freed):
+        job.update(files_removed=files_removed, bytes_freed=bytes_freed)
+        _save(job)
+
+    try:
+        results, folder_deleted = delete_movie_files(
+            job["movie_id"],
+            job["file_types"],
+            remove_folder=job["remove_folder"],
+            on_progress=on_progress,
+        )
+    except Exception as e:
+        # Часть файлов могла быть удалена до ошибки
+        publish_path_changed(movie_dir(job["movie_id"]), "delete", job["movie_id"])
+        logger.error(
+            f"Ошибка в задаче удаления {job['id']} (movie_id={job['movie_id']}): {e}",
+            exc_info=True,
+        )
+        job.update(status="failed", success=False, error=str(e), finished_at=time.time())
+        _save(job)
+        return
+
+    if job["remove_folder"]:
+        success = folder_deleted
+    else:
+        success = all(results.values())
+
+    publish_path_changed(movie_dir(job["movie_id"]), "delete", job["movie_id"])
+    job.update(
+        status="finished",
+        results=results,
+        folder_deleted=folder_deleted,
+        success=success,
+        finished_at=time.time(),
+    )
+    _save(job)
+    logger.info(
+        f"Задача удаления {job['id']} завершена: movie_id={job['movie_id']}, "
+        f"удалено файлов {job['files_removed']}, освобождено {job['bytes_freed']} байт, результаты {results}"
+    )
@@ -0,0 +1,53 @@
+import json
+import logging
+import time
+import pika
+from server import settings
+
+logger = logging.getLogger(__name__)
+
+
+def rabbitmq_connection():
+    credentials = pika.PlainCredentials(
+        settings.RABBITMQ_DEFAULT_USER, settings.RABBITMQ_DEFAULT_PASS
+    )
+    return pika.BlockingConnection(
+        pika.ConnectionParameters(
+            host=settings.RABBITMQ_HOST,
+            port=settings.RABBITMQ_PORT,
+            credentials=credentials,
+        )
+    )
+
+
+def publish_path_changed(path, event, movie_id=None):
+    """
+    Сообщает зеркалам FTP (ftp-mirror-proxy), что поддерево path на FTP
+    изменилось и его нужно синхронизировать. Ошибка отправки не прерывает
+    запрос: поддерево подтянет периодическая полная сверка зеркала.
+    """
+    if not settings.MIRROR_EVENTS_EXCHANGE:
+        return
+    message = json.dumps(
+        {"path": path, "event": event, "movie_id": movie_id, "time": time.time()}
+    )
+    try:
+        connection = rabbitmq_connection()
+        try:
+            channel = connection.channel()
+            channel.exchange_declare(
+                exchange=settings.MIRROR_EVENTS_EXCHANGE,
+                exchange_type="fanout",
+                durable=True,
+            )
+            channel.basic_publish(
+                exchange=settings.MIRROR_EVENTS_EXCHANGE,
+                routing_key="",
+                body=message,
+                properties=pika.BasicProperties(delivery_mode=2),
+            )
+        finally:
+            connection.close()
+        logger.info(f"Событие зеркалу: {event} {path}")
+    except Exception as e:
+        logger.error(f"Не удалось отправить событие зеркалу ({event} {path}): {e}")
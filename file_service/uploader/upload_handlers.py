@@ -0,0 +1,116 @@
+import logging
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (
+    FileUploadHandler,
+    SkipFile,
+    StopFutureHandlers,
+)
+from uploader.ftp_pool import ftp_pool
+from uploader.ftp_utils import ensure_ftp_dir, movie_dir, validate_upload
+
+logger = logging.getLogger(__name__)
+
+
+class FTPStreamedFile(UploadedFile):
+    """Файл, уже записанный на FTP. Содержимого локально нет, только метаданные."""
+
+    def __init__(self, name, content_type, size, charset, remote_path, filename, ext):
+        super().__init__(
+            file=None, name=name, content_type=content_type, size=size, charset=charset
+        )
+        self.remote_path = remote_path
+        self.filename = filename
+        self.ext = ext
+
+
+class FTPStreamingUploadHandler(FileUploadHandler):
+    """
+    Пишет файловую часть multipart-запроса напрямую в FTP data-соединение.
+    Расширение проверяется по заголовкам части до открытия соединения,
+    а StopFutureHandlers не даёт стандартным обработчикам создать временный файл.
+    """
+
+    chunk_size = 1024 * 1024
+
+    def __init__(self, request, movie_id, content_type, field_name="file"):
+        super().__init__(request)
+        self.movie_id = movie_id
+        self.content_type_code = content_type
+        self.target_field = field_name
+        self.error = None
+        self.ftp = None
+        self.conn = None
+        self.remote_path = None
+        self.filename = None
+        self.ext = None
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        if field_name != self.target_field or self.remote_path is not None:
+            raise SkipFile()
+
+        filename, ext, error = validate_upload(self.content_type_code, file_name)
+        if error:
+            logger.warning(
+                f"Неверный формат файла {ext} для типа {self.content_type_code}"
+            )
+            self.error = error
+            raise SkipFile()
+
+        remote_dir = movie_dir(self.movie_id)
+        self.filename, self.ext = filename, ext
+        self.remote_path = f"{remote_dir}/{filename}{ext}"
+
+        self.ftp = ftp_pool.acquire()
+        try:
+            ensure_ftp_dir(self.ftp, remote_dir)
+            self.ftp.voidcmd("TYPE I")
+            self.conn = self.ftp.transfercmd(f"STOR {self.remote_path}")
+        except Exception:
+            self._release_ftp(broken=True)
+            raise
+        logger.debug(f"Открыт поток загрузки {file_name} -> {self.remote_path}")
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.conn.sendall(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        try:
+            # Ответ на STOR сервер шлёт после закрытия data-соединения
+            self.conn.close()
+            self.ftp.voidresp()
+        except Exception:
+            # Ответ не получен или это ошибка: соединение в неизвестном состоянии
+            self.conn = None
+            self._release_ftp(broken=True)
+            raise
+        self.conn = None
+        self._release_ftp()
+        logger.info(f"Файл успешно загружен на FTP: {self.remote_path} ({file_size} байт)")
+        return FTPStreamedFile(
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            remote_path=self.remote_path,
+            filename=self.filename,
+            ext=self.ext,
+        )
+
+    def upload_interrupted(self):
+        if self.conn is not None:
+            logger.warning(f"Загрузка прервана, недописанный файл: {self.remote_path}")
+            self.conn.close()
+            self.conn = None
+            # Управляющее соединение ждёт ответа на прерванный STOR, в пул его не возвращаем
+            self._release_ftp(broken=True)
+        else:
+            self._release_ftp()
+
+    def _release_ftp(self, broken=False):
+        if self.ftp is None:
+            return
+        ftp_pool.release(self.ftp, broken=broken)
+        self.ftp = None
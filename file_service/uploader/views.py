@@ -1,20 +1,32 @@
-import os
+import io
+import uuid
 import pika
 import json
-import ftplib
-from ftplib import FTP
-import ftputil
 import logging
+from django.core import signing
 from django.core.files.storage import default_storage
 from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from django.http import JsonResponse
+from django.urls import reverse
 from rest_framework.decorators import permission_classes
 from rest_framework import status
 from urllib.parse import urlparse
 from server import settings
 from server.permissions import IsAdminOrSuperUser
+from uploader.upload_handlers import FTPStreamingUploadHandler
+from uploader.jobs import get_deletion_job, start_deletion_job
+from uploader.ftp_pool import ftp_pool
+from uploader.mirror_events import publish_path_changed, rabbitmq_connection
+from server.http_client import http_client
+from uploader.ftp_utils import (
+    FILE_MAP,
+    ensure_ftp_dir,
+    movie_dir,
+    remote_size,
+    validate_upload,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -23,16 +35,7 @@ def send_to_rabbitmq(movie_id, file_url):
     ftp_user = settings.FTP_SERVER_USER
     ftp_password = settings.FTP_SERVER_PASSWORD
     try:
-        credentials = pika.PlainCredentials(
-            settings.RABBITMQ_DEFAULT_USER, settings.RABBITMQ_DEFAULT_PASS
-        )
-        connection = pika.BlockingConnection(
-            pika.ConnectionParameters(
-                host=settings.RABBITMQ_HOST,
-                port=settings.RABBITMQ_PORT,
-                credentials=credentials,
-            )
-        )
+        connection = rabbitmq_connection()
         channel = connection.channel()
 
         channel.queue_declare(queue=settings.RABBITMQ_QUEUE, durable=True)
@@ -63,7 +66,7 @@ def send_to_rabbitmq(movie_id, file_url):
 @permission_classes([IsAdminOrSuperUser])
 class UploadFileView(APIView):
 
-    FILE_MAP = {"film": "m", "poster": "p", "trailer": "t"}
+    FILE_MAP = FILE_MAP
 
     def post(self, request, movie_id, content_type):
         logger.info(
@@ -74,274 +77,230 @@ class UploadFileView(APIView):
             logger.warning(f"Неверный content_type: {content_type}")
             return JsonResponse({"error": "Invalid content_type"}, status=400)
 
-        uploaded_file = request.FILES.get("file")
+        handler = FTPStreamingUploadHandler(request, movie_id, content_type)
+        request.upload_handlers.insert(0, handler)
+
+        try:
+            uploaded_file = request.FILES.get("file")
+        except Exception as e:
+            handler.upload_interrupted()
+            logger.error(
+                f"Ошибка при загрузке файла для movie_id={movie_id}, content_type={content_type}: {e}",
+                exc_info=True,
+            )
+            return JsonResponse({"error": str(e)}, status=500)
+
+        if handler.error:
+            return JsonResponse({"error": handler.error}, status=400)
+
         if not uploaded_file:
             logger.warning("Файл не предоставлен в запросе")
             return JsonResponse({"error": "No file provided"}, status=400)
 
-        ext = os.path.splitext(uploaded_file.name)[1].lower()
-        allowed_formats = {
-            "m": [".mp4", ".mkv", ".avi"],
-            "t": [".mp4", ".mov", ".webm"],
-            "p": [".jpg", ".jpeg", ".png"],
-        }
+        return _upload_finished(
+            movie_id, content_type, uploaded_file.filename, uploaded_file.ext
+        )
 
-        filename = self.FILE_MAP[content_type]
-        if ext not in allowed_formats[filename]:
-            logger.warning(f"Неверный формат файла {ext} для типа {content_type}")
-            return JsonResponse(
-                {
-                    "error": f'Invalid file format for {content_type}. Allowed formats: {", ".join(allowed_formats[filename])}'
-                },
-                status=400,
-            )
 
-        remote_dir = f"{settings.FTP_STORAGE_LOCATION}/movies/{movie_id}"
-        remote_path = f"{remote_dir}/{filename}{ext}"
-        logger.debug(f"Целевая директория на FTP: {remote_dir}")
-        logger.debug(f"Целевой путь на FTP: {remote_path}")
+def _upload_finished(movie_id, content_type, filename, ext):
+    """Общий финал загрузки: постановка фильма в очередь и ответ клиенту."""
+    file_url = f"{settings.FILE_SERVER_URL}/{movie_id}/{filename}"
+    publish_path_changed(movie_dir(movie_id), "upload", movie_id)
 
-        try:
-            with FTP() as ftp:
-                logger.debug(
-                    f"Подключение к FTP {settings.FTP_SERVER_HOST}:{settings.FTP_SERVER_PORT}..."
-                )
-                ftp.connect(settings.FTP_SERVER_HOST, settings.FTP_SERVER_PORT)
-                ftp.set_pasv(True)
-                ftp.login(settings.FTP_SERVER_USER, settings.FTP_SERVER_PASSWORD)
-                logger.debug("Успешное подключение к FTP")
-
-                logger.debug(f"Проверка/создание директории {remote_dir}")
-                self._ensure_ftp_dir(ftp, remote_dir)
-
-                logger.debug(f"Начало загрузки файла {uploaded_file.name}")
-                uploaded_file.seek(0)
-                ftp.storbinary(
-                    f"STOR {remote_path}", uploaded_file.file, blocksize=1024 * 1024
-                )
-                logger.info(f"Файл успешно загружен на FTP: {remote_path}")
+    if content_type == "film":
+        logger.debug(f"Отправка сообщения в RabbitMQ для фильма {movie_id}")
+        send_to_rabbitmq(movie_id, f"{file_url}{ext}")
 
-            file_url = f"{settings.FILE_SERVER_URL}/{movie_id}/{filename}"
+    logger.info(
+        f"Загрузка завершена успешно для movie_id={movie_id}, content_type={content_type}"
+    )
+    return JsonResponse({"movie_id": movie_id, "file_url": f"{file_url}{ext}"})
 
-            if content_type == "film":
-                logger.debug(f"Отправка сообщения в RabbitMQ для фильма {movie_id}")
-                send_to_rabbitmq(movie_id, f"{file_url}{ext}")
 
-            logger.info(
-                f"Загрузка завершена успешно для movie_id={movie_id}, content_type={content_type}"
-            )
-            return JsonResponse({"movie_id": movie_id, "file_url": f"{file_url}{ext}"})
+CHUNKED_UPLOAD_SALT = "uploader.chunked_upload"
 
-        except Exception as e:
-            logger.error(
-                f"Ошибка при загрузке файла для movie_id={movie_id}, content_type={content_type}: {e}",
-                exc_info=True,
-            )
-            return JsonResponse({"error": str(e)}, status=500)
 
-    def _ensure_ftp_dir(self, ftp, path):
-        directories = path.strip("/").split("/")
-        current = ""
-        for dir in directories:
-            if not dir:
-                continue
-            current += "/" + dir
-            try:
-                ftp.cwd(current)
-                logger.debug(f"Директория существует: {current}")
-            except ftplib.error_perm:
-                logger.debug(f"Создание директории: {current}")
-                ftp.mkd(current)
-                ftp.cwd(current)
-                logger.debug(f"Директория создана и выбрана: {current}")
-            except Exception as e:
-                logger.error(
-                    f"Неожиданная ошибка при работе с директорией {current}: {e}"
-                )
-                raise
-
-
-def _delete_original_video_files(
-    ftp_host: str, ftp_user: str, ftp_pass: str, base_path: str, movie_id: int
-):
-    """Удаляет оригинальные видеофайлы."""
-    original_video_names = [f"m{ext}" for ext in [".mp4", ".mkv", ".avi"]]
-    deleted_any = False
-
-    with ftputil.FTPHost(ftp_host, ftp_user, ftp_pass) as ftp:
-        for fname in original_video_names:
-            original_video_path = f"{base_path}/{fname}"
-            if not ftp.path.exists(original_video_path):
-                logger.info(f"Оригинальный видеофайл не найден: {original_video_path}")
-                continue
-
-            try:
-                ftp.remove(original_video_path)
-                logger.info(f"Удален оригинальный видеофайл: {original_video_path}")
-                deleted_any = True
-            except Exception as e:
-                logger.error(
-                    f"Ошибка при удалении оригинального видеофайла {original_video_path}: {e}"
-                )
-
-    return deleted_any
+def _part_path(session):
+    return f"{movie_dir(session['movie_id'])}/.{session['filename']}.{session['nonce']}{session['ext']}.part"
 
 
-def _delete_transcoded_files(
-    startswith: str,
-    ftp_host: str,
-    ftp_user: str,
-    ftp_pass: str,
-    base_path: str,
-    movie_id: int,
-):
-    transcoded_dir = f"{base_path}/transcoded"
-    deleted_count = 0
+def _load_upload_session(upload_id, movie_id, content_type):
+    """
+    Расшифровывает upload_id. Сессия хранится в самом токене (подписан SECRET_KEY),
+    а текущее смещение - это размер .part файла на FTP, поэтому состояние
+    не теряется между воркерами и рестартами сервиса.
+    """
+    try:
+        session = signing.loads(
+            upload_id,
+            salt=CHUNKED_UPLOAD_SALT,
+            max_age=settings.CHUNKED_UPLOAD_MAX_AGE,
+        )
+    except signing.BadSignature:
+        return None
+    if session.get("movie_id") != movie_id or session.get("content_type") != content_type:
+        return None
+    return session
 
-    with ftputil.FTPHost(ftp_host, ftp_user, ftp_pass) as ftp:
 
-        if not ftp.path.exists(transcoded_dir):
-            logger.info(f"Папка транскодированных файлов не найдена: {transcoded_dir}")
-            return 0
-        if not ftp.path.isdir(transcoded_dir):
-            logger.info(f"Путь {transcoded_dir} не является директорией")
-            return 0
+@permission_classes([IsAdminOrSuperUser])
+class ChunkedUploadBeginView(APIView):
+    """
+    Начало возобновляемой загрузки.
+    Тело: {"filename": "movie.mp4"}. Возвращает upload_id и начальное смещение.
+    """
 
-        logger.info(f"Просмотр директории транскодированных файлов: {transcoded_dir}")
+    def post(self, request, movie_id, content_type):
+        filename, ext, error = validate_upload(
+            content_type, request.data.get("filename")
+        )
+        if error:
+            logger.warning(
+                f"Отклонена chunked-загрузка movie_id={movie_id}, content_type={content_type}: {error}"
+            )
+            return JsonResponse({"error": error}, status=400)
+
+        session = {
+            "movie_id": movie_id,
+            "content_type": content_type,
+            "filename": filename,
+            "ext": ext,
+            "nonce": uuid.uuid4().hex,
+        }
+        upload_id = signing.dumps(session, salt=CHUNKED_UPLOAD_SALT)
+        part_path = _part_path(session)
 
         try:
-            items = ftp.listdir(transcoded_dir)
-        except Exception as list_err:
+            with ftp_pool.connection() as ftp:
+                ensure_ftp_dir(ftp, movie_dir(movie_id))
+                ftp.storbinary(f"STOR {part_path}", io.BytesIO(b""))
+        except Exception as e:
             logger.error(
-                f"Ошибка при получении списка файлов из {transcoded_dir}: {list_err}"
+                f"Ошибка при создании chunked-загрузки для movie_id={movie_id}: {e}",
+                exc_info=True,
             )
-            return 0
+            return JsonResponse({"error": str(e)}, status=500)
 
-        logger.debug(f"Найдено элементов в {transcoded_dir}: {items}")
+        logger.info(f"Начата chunked-загрузка {part_path} для movie_id={movie_id}")
+        return JsonResponse({"upload_id": upload_id, "offset": 0}, status=201)
 
-        for item in items:
-            item_path = ftp.path.join(transcoded_dir, item)
 
-            if not (ftp.path.isfile(item_path) and item.startswith(startswith)):
-                continue
+@permission_classes([IsAdminOrSuperUser])
+class ChunkedUploadChunkView(APIView):
+    """
+    GET - текущее подтверждённое смещение (для возобновления после обрыва).
+    PUT - дописывает тело запроса в .part файл начиная с X-Upload-Offset.
+    Смещение должно совпадать с размером .part файла, иначе 409 и актуальное смещение.
+    """
 
-            try:
-                ftp.remove(item_path)
-                logger.info(f"Удален транскодированный файл: {item_path}")
-                deleted_count += 1
-            except Exception as e:
-                logger.warning(
-                    f"Не удалось удалить транскодированный файл {item_path}: {e}"
-                )
+    def get(self, request, movie_id, content_type, upload_id):
+        session = _load_upload_session(upload_id, movie_id, content_type)
+        if session is None:
+            return JsonResponse({"error": "Invalid upload_id"}, status=404)
 
-        logger.info(
-            f"Удалено {deleted_count} транскодированных файлов из {transcoded_dir}"
-        )
+        try:
+            with ftp_pool.connection() as ftp:
+                offset = remote_size(ftp, _part_path(session))
+        except Exception as e:
+            logger.error(f"Ошибка при получении смещения загрузки: {e}", exc_info=True)
+            return JsonResponse({"error": str(e)}, status=500)
 
-        _remove_empty_dir(ftp, transcoded_dir)
+        if offset is None:
+            return JsonResponse({"error": "Upload not found"}, status=404)
+        return JsonResponse({"upload_id": upload_id, "offset": offset})
 
-    return deleted_count
+    def put(self, request, movie_id, content_type, upload_id):
+        session = _load_upload_session(upload_id, movie_id, content_type)
+        if session is None:
+            return JsonResponse({"error": "Invalid upload_id"}, status=404)
 
+        offset = request.headers.get("X-Upload-Offset", "")
+        if not offset.isdigit():
+            return JsonResponse({"error": "X-Upload-Offset header is required"}, status=400)
+        offset = int(offset)
 
-def _remove_empty_dir(ftp, transcoded_dir: str):
-    """Удаляет пустую директорию, если она существует."""
-    try:
-        remaining_items = ftp.listdir(transcoded_dir)
-        if not remaining_items:
-            logger.info(
-                f"Папка транскодированных файлов {transcoded_dir} пуста, попытка удаления папки."
-            )
-            ftp.rmdir(transcoded_dir)
-            logger.info(
-                f"Удалена пустая папка транскодированных файлов: {transcoded_dir}"
-            )
-            return True
-        else:
-            logger.info(
-                f"Папка транскодированных файлов {transcoded_dir} не пуста, оставлено {len(remaining_items)} элементов."
+        stream = request.stream
+        if stream is None:
+            return JsonResponse({"error": "Empty chunk"}, status=400)
+
+        part_path = _part_path(session)
+        try:
+            with ftp_pool.connection() as ftp:
+                current = remote_size(ftp, part_path)
+                if current is None:
+                    return JsonResponse({"error": "Upload not found"}, status=404)
+                if current != offset:
+                    logger.warning(
+                        f"Смещение {offset} не совпадает с размером {part_path} ({current})"
+                    )
+                    return JsonResponse(
+                        {"error": "Offset mismatch", "offset": current}, status=409
+                    )
+
+                ftp.storbinary(f"APPE {part_path}", stream, blocksize=1024 * 1024)
+                new_offset = remote_size(ftp, part_path)
+        except Exception as e:
+            logger.error(
+                f"Ошибка при дозаписи chunk в {part_path} с {offset}: {e}",
+                exc_info=True,
             )
-            return False
-    except Exception as e:
-        logger.warning(f"Ошибка при проверке/удалении папки {transcoded_dir}: {e}")
-        return False
-
-
-def _delete_simple_file(
-    ftp_host: str, ftp_user: str, ftp_pass: str, base_path: str, file_type: str
-):
-    """Удаляет простой файл (постер или трейлер)."""
-    file_names_map = {"p": ["p.jpg"], "t": ["t.mp4"]}
-
-    file_names = file_names_map.get(file_type, [])
-    if not file_names:
-        logger.warning(f"Неизвестный тип файла для удаления: {file_type}")
-        return False
-
-    deleted_any = False
-    with ftputil.FTPHost(ftp_host, ftp_user, ftp_pass) as ftp:
-        for fname in file_names:
-            full_path = f"{base_path}/{fname}"
-            if not ftp.path.exists(full_path):
-                logger.info(f"Файл для удаления не найден: {full_path}")
-                continue
-
-            try:
-                ftp.remove(full_path)
-                logger.info(f"Удален файл: {full_path}")
-                deleted_any = True
-            except Exception as e:
-                logger.error(f"Ошибка при удалении файла {full_path}: {e}")
-
-    return deleted_any
-
-
-def delete_movie_files_from_ftp(
-    movie_id: int, file_type: str, ftp_host: str, ftp_user: str, ftp_pass: str
-) -> bool:
-    """
-    Удаляет файлы, связанные с фильмом, с FTP-сервера.
-    Для 'm' (видео) удаляет оригинальный файл и транскодированные файлы, начинающиеся с 'm'.
-    Для 'p' (постер) и 't' (трейлер) удаляет только указанный файл.
-    """
-    base_path = f"{settings.FTP_STORAGE_LOCATION}/movies/{movie_id}"
-    logger.info(
-        f"Начало удаления файлов для movie_id={movie_id}, тип={file_type}, базовый путь={base_path}"
-    )
+            return JsonResponse({"error": str(e)}, status=500)
 
-    delete_status = True
+        logger.debug(f"Chunk записан в {part_path}: {offset} -> {new_offset}")
+        return JsonResponse({"upload_id": upload_id, "offset": new_offset})
 
-    try:
-        if file_type == "m":
 
-            delete_status = _delete_original_video_files(
-                ftp_host, ftp_user, ftp_pass, base_path, movie_id
-            )
+@permission_classes([IsAdminOrSuperUser])
+class ChunkedUploadCommitView(APIView):
+    """
+    Завершение загрузки: .part файл переименовывается в итоговый,
+    для фильма отправляется сообщение на транскодирование.
+    Необязательное поле "size" в теле проверяется против размера на FTP.
+    """
 
-            delete_status = _delete_transcoded_files(
-                "m", ftp_host, ftp_user, ftp_pass, base_path, movie_id
-            )
+    def post(self, request, movie_id, content_type, upload_id):
+        session = _load_upload_session(upload_id, movie_id, content_type)
+        if session is None:
+            return JsonResponse({"error": "Invalid upload_id"}, status=404)
 
-        elif file_type in ["p", "t"]:
+        part_path = _part_path(session)
+        remote_path = f"{movie_dir(movie_id)}/{session['filename']}{session['ext']}"
+        expected_size = request.data.get("size")
+        if expected_size is not None and not str(expected_size).isdigit():
+            return JsonResponse({"error": "Invalid size"}, status=400)
 
-            delete_status = _delete_simple_file(
-                ftp_host, ftp_user, ftp_pass, base_path, file_type
+        try:
+            with ftp_pool.connection() as ftp:
+                current = remote_size(ftp, part_path)
+                if current is None:
+                    return JsonResponse({"error": "Upload not found"}, status=404)
+                if expected_size is not None and int(expected_size) != current:
+                    return JsonResponse(
+                        {"error": "Size mismatch", "offset": current}, status=409
+                    )
+                ftp.rename(part_path, remote_path)
+                logger.info(f"Chunked-загрузка завершена: {part_path} -> {remote_path}")
+        except Exception as e:
+            logger.error(
+                f"Ошибка при завершении загрузки для movie_id={movie_id}, content_type={content_type}: {e}",
+                exc_info=True,
             )
+            return JsonResponse({"error": str(e)}, status=500)
 
-        else:
-            logger.warning(f"Неизвестный тип файла для удаления: {file_type}")
-            return False
+        return _upload_finished(movie_id, content_type, session["filename"], session["ext"])
 
-        if delete_status:
-            logger.info(
-                f"Завершено удаление файлов для movie_id={movie_id}, тип={file_type}"
-            )
-        return delete_status
 
-    except Exception as e:
-        logger.error(
-            f"Ошибка при удалении файлов фильма {movie_id} типа {file_type} с FTP: {e}"
-        )
-        return False
+def _job_accepted(request, job):
+    return JsonResponse(
+        {
+            "job_id": job["id"],
+            "status": job["status"],
+            "status_url": request.build_absolute_uri(
+                reverse("delete-job", args=[job["id"]])
+            ),
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
 
 
 @permission_classes([IsAdminOrSuperUser])
@@ -374,92 +333,8 @@ class DeleteFileView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        try:
-            success = delete_movie_files_from_ftp(
-                movie_id, internal_file_type, ftp_host, ftp_user, ftp_pass
-            )
-
-            if success:
-                logging.info(
-                    f"Файлы типа '{internal_file_type}' для фильма ID {movie_id} успешно удалены с FTP."
-                )
-                return JsonResponse(
-                    {
-                        "message": f"Файлы типа '{content_type}' для фильма успешно удалены."
-                    },
-                    status=status.HTTP_200_OK,
-                )
-            else:
-                logging.warning(
-                    f"Не удалось удалить файлы типа '{internal_file_type}' для фильма ID {movie_id}."
-                )
-                return JsonResponse(
-                    {"error": f"Не удалось удалить файлы типа '{content_type}'."},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
-
-        except Exception as e:
-            logging.error(
-                f"Ошибка в DeleteFileView при удалении movie_id={movie_id}, content_type={content_type}: {e}",
-                exc_info=True,
-            )
-            return JsonResponse(
-                {"error": "Внутренняя ошибка сервера при удалении файла"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
-
-
-def _remove_movie_folder(
-    ftp_host: str, ftp_user: str, ftp_pass: str, base_path: str, movie_id: int
-) -> bool:
-    """
-    Удаляет папку фильма, если она существует и пуста.
-    Сначала пытается удалить папку 'transcoded' внутри неё, используя _remove_empty_dir.
-    Затем проверяет, пуста ли сама папка фильма, и удаляет её.
-    """
-    logger.info(f"Попытка удаления папки фильма: {base_path}")
-    folder_deleted = False
-    try:
-        with ftputil.FTPHost(ftp_host, ftp_user, ftp_pass) as ftp:
-
-            transcoded_dir = f"{base_path}/transcoded"
-
-            if ftp.path.exists(transcoded_dir) and ftp.path.isdir(transcoded_dir):
-                _remove_empty_dir(ftp, transcoded_dir)
-
-            if not ftp.path.exists(base_path):
-                logger.info(f"Папка фильма {base_path} не существует на FTP.")
-                return True
-            if not ftp.path.isdir(base_path):
-                logger.warning(
-                    f"Путь {base_path} существует, но не является директорией."
-                )
-                return False
-
-            try:
-                items = ftp.listdir(base_path)
-                if not items:
-                    logger.info(f"Папка фильма {base_path} пуста, пробуем удалить.")
-                    ftp.rmdir(base_path)
-                    folder_deleted = True
-                    logger.info(f"Папка фильма {base_path} успешно удалена.")
-                else:
-                    logger.warning(
-                        f"Папка фильма {base_path} не пуста. Удаление невозможно. Оставшиеся элементы: {items}"
-                    )
-
-            except Exception as list_err:
-                logger.error(
-                    f"Ошибка при проверке содержимого папки фильма {base_path}: {list_err}"
-                )
-
-    except Exception as e:
-        logger.error(
-            f"Ошибка при попытке удаления папки фильма {base_path} (movie_id={movie_id}): {e}",
-            exc_info=True,
-        )
-
-    return folder_deleted
+        job = start_deletion_job(movie_id, [internal_file_type])
+        return _job_accepted(request, job)
 
 
 class DeleteAllMovieFilesView(APIView):
@@ -484,94 +359,77 @@ class DeleteAllMovieFilesView(APIView):
                 status=500,
             )
 
-        base_path = f"{settings.FTP_STORAGE_LOCATION}/movies/{movie_id}"
         logger.info(
-            f"Начало удаления всех файлов и папки для movie_id={movie_id}, базовый путь={base_path}"
+            f"Начало удаления всех файлов и папки для movie_id={movie_id}, базовый путь={movie_dir(movie_id)}"
+        )
+        job = start_deletion_job(
+            movie_id, self.FILE_TYPES_TO_DELETE, remove_folder=True
         )
+        return _job_accepted(request, job)
 
-        deletion_results = {}
-        files_deleted_successfully = True
-
-        logger.info(f"Начало удаления отдельных типов файлов для movie_id={movie_id}")
-        for file_type in self.FILE_TYPES_TO_DELETE:
-            try:
-                success = delete_movie_files_from_ftp(
-                    movie_id=movie_id,
-                    file_type=file_type,
-                    ftp_host=ftp_host,
-                    ftp_user=ftp_user,
-                    ftp_pass=ftp_pass,
-                )
-                deletion_results[file_type] = success
 
-                if success:
-                    logger.info(
-                        f"Процесс удаления файлов типа '{file_type}' "
-                        f"для фильма ID {movie_id} завершен."
-                    )
-                else:
-                    logger.info(
-                        f"Процесс удаления файлов типа '{file_type}' "
-                        f"для фильма ID {movie_id} не нашел файлов для удаления или завершился без действий."
-                    )
+class BulkDeleteMovieFilesView(APIView):
+    """
+    Удаление всех файлов сразу нескольких фильмов.
+    Тело: {"movie_ids": [1, 2, 3]}. Каждый фильм - отдельная фоновая задача,
+    задачи выполняются параллельно в пределах DELETION_JOB_WORKERS.
+    """
 
-            except Exception as e:
-                deletion_results[file_type] = False
-                files_deleted_successfully = False
-                logger.error(
-                    f"Ошибка при вызове функции удаления файлов типа '{file_type}' "
-                    f"для фильма ID {movie_id}: {e}",
-                    exc_info=True,
-                )
+    permission_classes = [IsAuthenticated, IsAdminOrSuperUser]
 
-        folder_deleted = False
-        if files_deleted_successfully:
-            folder_deleted = _remove_movie_folder(
-                ftp_host, ftp_user, ftp_pass, base_path, movie_id
-            )
-        else:
-            logger.warning(
-                f"Пропуск удаления папки фильма {base_path} из-за ошибок при удалении файлов."
+    def post(self, request):
+        movie_ids = request.data.get("movie_ids")
+        if not isinstance(movie_ids, list) or not all(
+            isinstance(movie_id, int) for movie_id in movie_ids
+        ):
+            return JsonResponse(
+                {"error": "movie_ids должен быть списком целых чисел"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        all_files_results = list(deletion_results.values())
-        all_files_handled = all_files_results and all(
-            r is not False for r in all_files_results
+        jobs = [
+            start_deletion_job(
+                movie_id,
+                DeleteAllMovieFilesView.FILE_TYPES_TO_DELETE,
+                remove_folder=True,
+            )
+            for movie_id in dict.fromkeys(movie_ids)
+        ]
+        return JsonResponse(
+            {
+                "jobs": [
+                    {"movie_id": job["movie_id"], "job_id": job["id"]} for job in jobs
+                ]
+            },
+            status=status.HTTP_202_ACCEPTED,
         )
 
-        if files_deleted_successfully and folder_deleted:
-            message = f"Все файлы и папка для фильма ID {movie_id} успешно удалены."
-            logger.info(message)
-            return JsonResponse({"message": message}, status=200)
 
-        elif files_deleted_successfully and not folder_deleted:
+class DeletionJobStatusView(APIView):
+    """Статус и прогресс фоновой задачи удаления."""
 
-            message = (
-                f"Файлы для фильма ID {movie_id} обработаны. "
-                f"Папка {base_path} не была удалена (возможно, не пуста или не существует). "
-                f"Результаты удаления файлов: {deletion_results}"
-            )
-            logger.warning(message)
-            return JsonResponse(
-                {
-                    "message": "Операция завершена частично.",
-                    "details": message,
-                    "results": deletion_results,
-                },
-                status=200,
-            )
-        else:
+    permission_classes = [IsAuthenticated, IsAdminOrSuperUser]
 
-            message = (
-                f"Удаление некоторых файлов или папки для фильма ID {movie_id} не удалось. "
-                f"Результаты удаления файлов: {deletion_results}"
-            )
-            logger.error(message)
+    def get(self, request, job_id):
+        job = get_deletion_job(job_id)
+        if job is None:
             return JsonResponse(
-                {
-                    "error": "Не удалось полностью выполнить операцию удаления.",
-                    "details": message,
-                    "results": deletion_results,
-                },
-                status=500,
+                {"error": "Задача не найдена"}, status=status.HTTP_404_NOT_FOUND
             )
+        return JsonResponse(job)
+
+
+@permission_classes([IsAdminOrSuperUser])
+class FTPPoolStatsView(APIView):
+    """Метрики пула FTP-соединений текущего процесса (для подбора FTP_POOL_MAX_SIZE)."""
+
+    def get(self, request):
+        return JsonResponse(ftp_pool.stats())
+
+
+@permission_classes([IsAdminOrSuperUser])
+class HTTPClientStatsView(APIView):
+    """Метрики межсервисного HTTP-клиента текущего процесса по каждому upstream."""
+
+    def get(self, request):
+        return JsonResponse(http_client.stats())
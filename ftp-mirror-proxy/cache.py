@@ -0,0 +1,177 @@
+"""
+Индекс ограниченного по размеру дискового кэша зеркала (SQLite, общий для
+origin.py и cache_manager.py).
+
+Для каждого файла хранятся размер, время последнего обращения, число
+обращений и признак закрепления. Счётчики попаданий, промахов, скачанных и
+вытесненных байт копятся там же и отдаются на /cache-stats.
+"""
+import fnmatch
+import logging
+import os
+import sqlite3
+import time
+
+# 0 - кэш не ограничен (полное зеркало FTP, как раньше)
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", "0"))
+# Вытеснение идёт до этой доли CACHE_MAX_BYTES
+CACHE_LOW_WATERMARK = float(os.getenv("CACHE_LOW_WATERMARK", "0.9"))
+# lru - давно не запрашиваемые первыми, lfu - редко запрашиваемые первыми
+CACHE_POLICY = os.getenv("CACHE_POLICY", "lru")
+# Закреплённые файлы не вытесняются: плейлисты и постеры (p.jpg, p.png...)
+CACHE_PIN_PATTERNS = os.getenv("CACHE_PIN_PATTERNS", "*.m3u8 */p.*").split()
+CACHE_DB = os.getenv(
+    "CACHE_DB",
+    os.path.join(os.getenv("LOCAL_PATH", "/usr/share/nginx/files"), ".fetch-tmp", "cache.sqlite3"),
+)
+# Окно для расчёта скорости заполнения кэша
+FILL_RATE_WINDOW = 300
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    pinned INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS fills (minute INTEGER PRIMARY KEY, bytes INTEGER NOT NULL);
+"""
+
+COUNTERS = (
+    "hits", "misses", "bytes_hit", "bytes_fetched", "bytes_evicted", "evictions",
+)
+
+
+def enabled():
+    return CACHE_MAX_BYTES > 0
+
+
+def is_pinned(path):
+    return any(fnmatch.fnmatch(path, pattern) for pattern in CACHE_PIN_PATTERNS)
+
+
+def connect():
+    os.makedirs(os.path.dirname(CACHE_DB), exist_ok=True)
+    db = sqlite3.connect(CACHE_DB, timeout=5)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def _count(db, **values):
+    for name, value in values.items():
+        db.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, value),
+        )
+
+
+def touch(db, path, size, now, hits=1):
+    db.execute(
+        "INSERT INTO objects (path, size, last_access, hits, pinned) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(path) DO UPDATE SET size = excluded.size, "
+        "last_access = max(last_access, excluded.last_access), hits = hits + excluded.hits",
+        (path, size, now, hits, int(is_pinned(path))),
+    )
+
+
+def _safely(func):
+    """Учёт статистики не должен ломать отдачу файлов."""
+
+    def wrapper(*args, **kwargs):
+        if not enabled():
+            return
+        try:
+            db = connect()
+            try:
+                with db:
+                    func(db, *args, **kwargs)
+            finally:
+                db.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Индекс кэша недоступен: {e}")
+
+    return wrapper
+
+
+@_safely
+def record_hit(db, path, size):
+    touch(db, path, size, time.time())
+    _count(db, hits=1, bytes_hit=size)
+
+
+@_safely
+def record_miss(db, path):
+    _count(db, misses=1)
+
+
+@_safely
+def record_fill(db, path, size):
+    now = time.time()
+    touch(db, path, size, now, hits=0)
+    _count(db, bytes_fetched=size)
+    db.execute(
+        "INSERT INTO fills (minute, bytes) VALUES (?, ?) "
+        "ON CONFLICT(minute) DO UPDATE SET bytes = bytes + excluded.bytes",
+        (int(now // 60), size),
+    )
+
+
+def record_accesses(db, accesses):
+    """accesses - {path: (size, last_access, count)}, накопленные origin.py."""
+    with db:
+        for path, (size, last_access, count) in accesses.items():
+            touch(db, path, size, last_access, hits=count)
+            _count(db, hits=count, bytes_hit=size * count)
+
+
+def total_size(db):
+    return db.execute("SELECT coalesce(sum(size), 0) FROM objects").fetchone()[0]
+
+
+def eviction_candidates(db):
+    order = "hits, last_access" if CACHE_POLICY == "lfu" else "last_access"
+    return db.execute(
+        f"SELECT path, size FROM objects WHERE pinned = 0 ORDER BY {order}"
+    )
+
+
+def forget(db, paths, evicted_bytes=0):
+    with db:
+        db.executemany("DELETE FROM objects WHERE path = ?", [(path,) for path in paths])
+        if evicted_bytes:
+            _count(db, bytes_evicted=evicted_bytes, evictions=len(paths))
+
+
+def stats(db):
+    counters = dict.fromkeys(COUNTERS, 0)
+    counters.update(db.execute("SELECT name, value FROM counters"))
+    requests = counters["hits"] + counters["misses"]
+    entries, size, pinned_size = db.execute(
+        "SELECT count(*), coalesce(sum(size), 0), "
+        "coalesce(sum(CASE WHEN pinned THEN size ELSE 0 END), 0) FROM objects"
+    ).fetchone()
+    since = int((time.time() - FILL_RATE_WINDOW) // 60)
+    recent_fill = db.execute(
+        "SELECT coalesce(sum(bytes), 0) FROM fills WHERE minute >= ?", (since,)
+    ).fetchone()[0]
+    return {
+        "policy": CACHE_POLICY,
+        "max_bytes": CACHE_MAX_BYTES,
+        "entries": entries,
+        "bytes": size,
+        "pinned_bytes": pinned_size,
+        "hit_ratio": round(counters["hits"] / requests, 4) if requests else None,
+        "byte_hit_ratio": (
+            round(counters["bytes_hit"] / (counters["bytes_hit"] + counters["bytes_fetched"]), 4)
+            if counters["bytes_hit"] + counters["bytes_fetched"]
+            else None
+        ),
+        "fill_rate_bytes_per_second": round(recent_fill / FILL_RATE_WINDOW, 1),
+        **counters,
+    }
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Обслуживание ограниченного дискового кэша (CACHE_MAX_BYTES > 0).
+
+Время и число обращений в индексе (cache.py) обновляют origin.py (попадания)
+и fetcher (промахи и скачанные файлы). Когда кэш превышает CACHE_MAX_BYTES,
+незакреплённые файлы удаляются в порядке CACHE_POLICY, пока размер не
+опустится до CACHE_LOW_WATERMARK. Индекс периодически сверяется с диском,
+так как файлы обновляет и удаляет ещё и sync.sh.
+"""
+import logging
+import os
+import time
+
+import cache
+from fetcher import FETCH_TMP_DIR, LOCAL_PATH
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+CACHE_EVICT_INTERVAL = int(os.getenv("CACHE_EVICT_INTERVAL", "10"))
+CACHE_SCAN_INTERVAL = int(os.getenv("CACHE_SCAN_INTERVAL", "300"))
+
+
+class CacheManager:
+    def __init__(self):
+        self.last_scan = None
+
+    def scan(self, db):
+        """Сверяет индекс с диском: добавляет неизвестные файлы, убирает пропавшие."""
+        known = dict(db.execute("SELECT path, size FROM objects"))
+        found = {}
+        for root, dirs, files in os.walk(LOCAL_PATH):
+            if root == LOCAL_PATH:
+                dirs[:] = [d for d in dirs if os.path.join(root, d) != FETCH_TMP_DIR]
+            for name in files:
+                full = os.path.join(root, name)
+                try:
+                    st = os.stat(full)
+                except FileNotFoundError:
+                    continue
+                found[os.path.relpath(full, LOCAL_PATH)] = (st.st_size, st.st_mtime)
+
+        with db:
+            for path, (size, mtime) in found.items():
+                if known.get(path) != size:
+                    cache.touch(db, path, size, mtime, hits=0)
+        cache.forget(db, [path for path in known if path not in found])
+        self.last_scan = time.monotonic()
+        logging.info(f"Сверка кэша: {len(found)} файлов на диске, {len(known)} в индексе")
+
+    def evict(self, db):
+        total = cache.total_size(db)
+        if total <= cache.CACHE_MAX_BYTES:
+            return
+        target = cache.CACHE_MAX_BYTES * cache.CACHE_LOW_WATERMARK
+        evicted, freed, remaining = [], 0, total
+        for path, size in cache.eviction_candidates(db).fetchall():
+            if remaining <= target:
+                break
+            try:
+                os.remove(os.path.join(LOCAL_PATH, path))
+                freed += size
+            except FileNotFoundError:
+                # Уже удалён sync.sh, из индекса убирается без учёта в вытесненных
+                pass
+            remaining -= size
+            evicted.append(path)
+        cache.forget(db, evicted, evicted_bytes=freed)
+        logging.info(
+            f"Вытеснено {len(evicted)} файлов, {freed} байт; в кэше {remaining} "
+            f"из {cache.CACHE_MAX_BYTES} байт"
+        )
+        if remaining > cache.CACHE_MAX_BYTES:
+            logging.warning("Закреплённые файлы не помещаются в CACHE_MAX_BYTES")
+
+    def run_once(self):
+        db = cache.connect()
+        try:
+            if self.last_scan is None or time.monotonic() - self.last_scan >= CACHE_SCAN_INTERVAL:
+                self.scan(db)
+            self.evict(db)
+        finally:
+            db.close()
+
+    def run(self):
+        logging.info(
+            f"Кэш до {cache.CACHE_MAX_BYTES} байт, политика {cache.CACHE_POLICY}, "
+            f"закреплены {cache.CACHE_PIN_PATTERNS}"
+        )
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Ошибка обслуживания кэша: {e}")
+            time.sleep(CACHE_EVICT_INTERVAL)
+
+
+if __name__ == "__main__":
+    CacheManager().run()
@@ -0,0 +1,362 @@
+"""
+Чтение файла с FTP по промаху локального кэша.
+
+Скачивается только запрошенный файл: во временный файл в FETCH_TMP_DIR,
+затем атомарный rename на место, так что nginx никогда не видит недокачанный
+файл. Одновременные промахи по одному пути (из потоков origin.py и
+предзагрузки) объединяются через flock: первый качает, остальные читают
+растущий временный файл, и все отдают байты клиенту по мере поступления.
+"""
+import errno
+import fcntl
+import ftplib
+import hashlib
+import logging
+import os
+import posixpath
+import time
+
+import cache
+
+FTP_HOST = os.getenv("FTP_HOST", "ftp-server")
+FTP_PORT = int(os.getenv("FTP_PORT", "21"))
+FTP_USER_NAME = os.getenv("FTP_USER_NAME", "")
+FTP_USER_PASS = os.getenv("FTP_USER_PASS", "")
+FTP_PATH = os.getenv("FTP_USER_NAME_HOME", "/")
+LOCAL_PATH = os.getenv("LOCAL_PATH", "/usr/share/nginx/files")
+# Временные файлы и блокировки; в той же ФС, что LOCAL_PATH, чтобы rename был атомарным
+FETCH_TMP_DIR = os.getenv("FETCH_TMP_DIR", os.path.join(LOCAL_PATH, ".fetch-tmp"))
+FETCH_CHUNK_SIZE = int(os.getenv("FETCH_CHUNK_SIZE", 256 * 1024))
+FETCH_TIMEOUT = int(os.getenv("FETCH_TIMEOUT", "30"))
+# Ожидающий процесс сдаётся, если временный файл не растёт столько секунд
+FETCH_STALL_TIMEOUT = int(os.getenv("FETCH_STALL_TIMEOUT", "30"))
+
+POLL_INTERVAL = 0.05
+# Файлы блокировок неудачных загрузок старше этого удаляет sweep_locks()
+LOCK_MAX_AGE = 3600
+
+logger = logging.getLogger(__name__)
+
+
+class FetchError(Exception):
+    """Файл не удалось получить с FTP."""
+
+
+class NotFound(FetchError):
+    """Файла нет на FTP."""
+
+
+def normalize(path):
+    """Путь относительно LOCAL_PATH или None для недопустимого пути."""
+    path = posixpath.normpath("/" + (path or "")).lstrip("/")
+    if not path or path == "." or any(part.startswith(".") for part in path.split("/")):
+        return None
+    return path
+
+
+def local_path(path):
+    return os.path.join(LOCAL_PATH, path)
+
+
+def remote_path(path):
+    return posixpath.join(FTP_PATH, path)
+
+
+class _Lock:
+    """
+    flock на файле блокировки пути; в сам файл ведущий пишет размер загрузки.
+    После успешной загрузки владелец удаляет файл, не отпуская блокировку,
+    поэтому захвативший блокировку проверяет, что его файл всё ещё на месте.
+    """
+
+    def __init__(self, name):
+        os.makedirs(FETCH_TMP_DIR, exist_ok=True)
+        self.path = os.path.join(FETCH_TMP_DIR, f"{name}.lock")
+        self.fd = self._open()
+
+    def _open(self):
+        return os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def _stale(self):
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self.fd).st_ino
+        except FileNotFoundError:
+            return True
+
+    def try_acquire(self):
+        while True:
+            try:
+                fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+                return False
+            if not self._stale():
+                return True
+            # Файл удалён прошлым владельцем - блокируем актуальный
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = self._open()
+
+    def held_by_other(self):
+        if self._stale():
+            return False
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        return False
+
+    def write_size(self, size):
+        os.ftruncate(self.fd, 0)
+        os.pwrite(self.fd, str(size if size is not None else "").encode(), 0)
+
+    def read_size(self):
+        data = os.pread(self.fd, 32, 0).decode().strip()
+        return int(data) if data.isdigit() else None
+
+    def release(self, remove=False):
+        if remove:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+        else:
+            os.ftruncate(self.fd, 0)
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def close(self):
+        os.close(self.fd)
+
+
+def sweep_locks(max_age=LOCK_MAX_AGE):
+    """Удаляет брошенные файлы блокировок (и .part) путей, загрузка которых не удалась."""
+    now = time.time()
+    removed = 0
+    if not os.path.isdir(FETCH_TMP_DIR):
+        return removed
+    for entry in os.scandir(FETCH_TMP_DIR):
+        if not entry.name.endswith(".lock"):
+            continue
+        try:
+            if now - entry.stat().st_mtime < max_age:
+                continue
+        except FileNotFoundError:
+            continue
+        name = entry.name[: -len(".lock")]
+        lock = _Lock(name)
+        if lock.try_acquire():
+            try:
+                os.unlink(os.path.join(FETCH_TMP_DIR, f"{name}.part"))
+            except FileNotFoundError:
+                pass
+            lock.release(remove=True)
+            removed += 1
+        lock.close()
+    return removed
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(FETCH_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+class Fetch:
+    """
+    Результат fetch(): size (None, если неизвестен) и итератор chunks().
+    Итератор ведущего докачивает файл в кэш, даже если клиент ушёл,
+    поэтому close() у него дочитывает загрузку до конца.
+    """
+
+    def __init__(self, size, chunks, drain=False):
+        self.size = size
+        self._chunks = chunks
+        self._drain = drain
+
+    def chunks(self):
+        return self._chunks
+
+    def close(self):
+        if not self._drain:
+            # Не у каждого итератора есть close() (пустой результат предзагрузки)
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()
+            return
+        for _ in self._chunks:
+            pass
+
+
+def fetch(path, prefetch=False):
+    """
+    Открывает файл кэша path (относительно LOCAL_PATH), при промахе
+    скачивая его с FTP. Бросает NotFound или FetchError.
+    prefetch - прогрев кэша: без учёта в попаданиях и промахах, а если файл
+    уже кто-то качает, сразу возвращается пустой результат.
+    """
+    target = local_path(path)
+    if os.path.isfile(target):
+        size = os.path.getsize(target)
+        if not prefetch:
+            cache.record_hit(path, size)
+        return Fetch(size, _read_file(target))
+
+    if not prefetch:
+        cache.record_miss(path)
+    name = hashlib.sha1(path.encode()).hexdigest()
+    lock = _Lock(name)
+    part = os.path.join(FETCH_TMP_DIR, f"{name}.part")
+    for _ in range(2):
+        if lock.try_acquire():
+            if os.path.isfile(target):
+                lock.release(remove=True)
+                lock.close()
+                return Fetch(os.path.getsize(target), _read_file(target))
+            return _download(path, target, part, lock)
+
+        if prefetch:
+            lock.close()
+            return Fetch(None, iter(()))
+        result = _follow(target, part, lock)
+        if result is not None:
+            return result
+        # Ведущий завершился без результата - пробуем скачать сами
+    lock.close()
+    raise FetchError(f"Не удалось дождаться загрузки {path}")
+
+
+def _connect():
+    ftp = ftplib.FTP(timeout=FETCH_TIMEOUT)
+    ftp.connect(FTP_HOST, FTP_PORT)
+    ftp.login(FTP_USER_NAME, FTP_USER_PASS)
+    ftp.set_pasv(True)
+    ftp.voidcmd("TYPE I")
+    return ftp
+
+
+def _download(path, target, part, lock):
+    remote = remote_path(path)
+    try:
+        ftp = _connect()
+        try:
+            size = ftp.size(remote)
+        except ftplib.error_perm as e:
+            ftp.close()
+            raise NotFound(f"{remote}: {e}") from e
+        conn = ftp.transfercmd(f"RETR {remote}")
+    except NotFound:
+        lock.release(remove=True)
+        lock.close()
+        raise
+    except (OSError, EOFError, ftplib.Error) as e:
+        lock.release()
+        lock.close()
+        raise FetchError(f"{remote}: {e}") from e
+
+    # Новый inode: читатели прерванной прошлой загрузки не увидят этот файл
+    try:
+        os.unlink(part)
+    except FileNotFoundError:
+        pass
+    out = open(part, "wb")
+    lock.write_size(size)
+    return Fetch(
+        size, _stream_download(path, target, part, lock, ftp, conn, out, size), drain=True
+    )
+
+
+def _stream_download(path, target, part, lock, ftp, conn, out, size):
+    started = time.monotonic()
+    received = 0
+    done = False
+    try:
+        with conn:
+            while True:
+                chunk = conn.recv(FETCH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                out.write(chunk)
+                out.flush()
+                received += len(chunk)
+                yield chunk
+        ftp.voidresp()
+        if size is not None and received != size:
+            raise FetchError(f"{path}: получено {received} из {size} байт")
+        out.close()
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(part, target)
+        done = True
+        cache.record_fill(path, received)
+        logger.info(
+            f"Скачан {path}: {received} байт за {time.monotonic() - started:.2f} с"
+        )
+    except (OSError, EOFError, ftplib.Error, FetchError) as e:
+        logger.error(f"Ошибка загрузки {path}: {e}")
+        out.close()
+        try:
+            os.unlink(part)
+        except FileNotFoundError:
+            pass
+        raise FetchError(f"{path}: {e}") from e
+    finally:
+        try:
+            ftp.close()
+        except Exception:
+            pass
+        lock.release(remove=done)
+        lock.close()
+
+
+def _follow(target, part, lock):
+    """Ждёт размер от ведущего и возвращает Fetch, читающий растущий файл; None - ведущий не справился."""
+    deadline = time.monotonic() + FETCH_STALL_TIMEOUT
+    while True:
+        if not lock.held_by_other():
+            if os.path.isfile(target):
+                lock.close()
+                return Fetch(os.path.getsize(target), _read_file(target))
+            return None
+        size = lock.read_size()
+        if size is not None:
+            try:
+                f = open(part, "rb")
+            except FileNotFoundError:
+                f = None
+            if f is not None:
+                return Fetch(size, _tail(f, size, lock))
+        if time.monotonic() > deadline:
+            lock.close()
+            raise FetchError("Ведущая загрузка не начинается")
+        time.sleep(POLL_INTERVAL)
+
+
+def _tail(f, size, lock):
+    received = 0
+    last_progress = time.monotonic()
+    try:
+        with f:
+            while received < size:
+                chunk = f.read(FETCH_CHUNK_SIZE)
+                if chunk:
+                    received += len(chunk)
+                    last_progress = time.monotonic()
+                    yield chunk
+                    continue
+                if not lock.held_by_other():
+                    # Ведущий мог дописать хвост и отпустить блокировку после нашего read()
+                    chunk = f.read(FETCH_CHUNK_SIZE)
+                    if chunk:
+                        received += len(chunk)
+                        yield chunk
+                        continue
+                    raise FetchError(f"Загрузка оборвалась на {received} из {size} байт")
+                if time.monotonic() - last_progress > FETCH_STALL_TIMEOUT:
+                    raise FetchError(f"Загрузка остановилась на {received} из {size} байт")
+                time.sleep(POLL_INTERVAL)
+    finally:
+        lock.close()
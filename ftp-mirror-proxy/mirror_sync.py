@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Синхронизация зеркала FTP по событиям.
+
+file-service и video-transcoder публикуют в fanout-обменник MIRROR_EVENTS_EXCHANGE
+сообщения {"path": "/media/movies/<id>", ...} о том, что поддерево на FTP
+изменилось. Демон копит события SYNC_DEBOUNCE секунд, схлопывает повторы одного
+пути и запускает sync.sh только для изменившихся поддеревьев. Полный обход
+дерева (sync.sh без аргументов) остаётся редкой сверкой раз в SYNC_FULL_INTERVAL
+секунд и при старте - на случай потерянных событий.
+"""
+import functools
+import json
+import logging
+import os
+import posixpath
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pika
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", "5672"))
+RABBITMQ_USER = os.getenv("RABBITMQ_DEFAULT_USER", "guest")
+RABBITMQ_PASS = os.getenv("RABBITMQ_DEFAULT_PASS", "guest")
+RABBITMQ_HEARTBEAT = int(os.getenv("RABBITMQ_HEARTBEAT", "60"))
+
+MIRROR_EVENTS_EXCHANGE = os.getenv("MIRROR_EVENTS_EXCHANGE", "mirror_events")
+# У каждого экземпляра зеркала должна быть своя очередь
+MIRROR_EVENTS_QUEUE = os.getenv("MIRROR_EVENTS_QUEUE", "ftp_mirror_sync")
+
+FTP_PATH = os.getenv("FTP_USER_NAME_HOME", "/")
+SYNC_SCRIPT = os.getenv("SYNC_SCRIPT", "/usr/local/bin/sync.sh")
+# Сколько ждать дальнейших событий перед синхронизацией (загрузка шлёт их пачкой)
+SYNC_DEBOUNCE = float(os.getenv("SYNC_DEBOUNCE", "2"))
+SYNC_FULL_INTERVAL = int(os.getenv("SYNC_FULL_INTERVAL", "3600"))
+SYNC_PREFETCH = int(os.getenv("SYNC_PREFETCH", "100"))
+
+RETRY_DELAY = 10
+
+
+def relative_path(path):
+    """Путь события относительно FTP_PATH или None, если он вне зеркалируемого дерева."""
+    if not isinstance(path, str) or not path:
+        return None
+    path = posixpath.normpath("/" + path)
+    root = posixpath.normpath("/" + FTP_PATH)
+    relative = posixpath.relpath(path, root)
+    if relative == "." or relative.startswith(".."):
+        return None
+    return relative
+
+
+def run_sync(path=None):
+    started = time.monotonic()
+    command = [SYNC_SCRIPT] + ([path] if path else [])
+    result = subprocess.run(command)
+    seconds = time.monotonic() - started
+    if result.returncode != 0:
+        logging.error(f"Синхронизация {path or 'всего дерева'} не удалась (код {result.returncode})")
+        return False
+    logging.info(f"Синхронизация {path or 'всего дерева'} за {seconds:.1f} с")
+    return True
+
+
+class MirrorSync:
+    """
+    Поток соединения только принимает сообщения и копит пути, синхронизация идёт
+    в одном фоновом потоке (lftp не запускаются параллельно над одним деревом).
+    Сообщения подтверждаются после успешной синхронизации своего пути, при
+    ошибке возвращаются в очередь.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mirror-sync")
+        self.pending = {}
+        self.first_pending_at = None
+        self.busy = False
+        self.last_full_sync = None
+
+    def full_sync_due(self):
+        return (
+            self.last_full_sync is None
+            or time.monotonic() - self.last_full_sync >= SYNC_FULL_INTERVAL
+        )
+
+    def full_sync(self):
+        self.last_full_sync = time.monotonic()
+        run_sync()
+
+    def on_message(self, channel, method, properties, body):
+        try:
+            path = relative_path(json.loads(body).get("path"))
+        except (ValueError, AttributeError):
+            path = None
+        if path is None:
+            logging.warning(f"Пропущено некорректное событие: {body[:200]!r}")
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            return
+        self.pending.setdefault(path, []).append(method.delivery_tag)
+        if self.first_pending_at is None:
+            self.first_pending_at = time.monotonic()
+
+    def flush(self, connection, channel):
+        if self.busy:
+            return
+        if self.pending and time.monotonic() - self.first_pending_at >= SYNC_DEBOUNCE:
+            batch, self.pending, self.first_pending_at = self.pending, {}, None
+            self.busy = True
+            future = self.executor.submit(self._sync_paths, batch)
+            future.add_done_callback(functools.partial(self._done, connection, channel, batch))
+        elif self.full_sync_due():
+            self.busy = True
+            future = self.executor.submit(self.full_sync)
+            future.add_done_callback(lambda _: setattr(self, "busy", False))
+
+    def _sync_paths(self, batch):
+        return {path: run_sync(path) for path in batch}
+
+    def _done(self, connection, channel, batch, future):
+        try:
+            results = future.result()
+        except Exception as e:
+            logging.error(f"Ошибка синхронизации: {e}")
+            results = {}
+        self.busy = False
+
+        def settle():
+            if not channel.is_open:
+                return
+            for path, tags in batch.items():
+                for tag in tags:
+                    if results.get(path):
+                        channel.basic_ack(delivery_tag=tag)
+                    else:
+                        channel.basic_nack(delivery_tag=tag, requeue=True)
+
+        try:
+            connection.add_callback_threadsafe(settle)
+        except Exception as e:
+            # Соединение закрыто: неподтверждённые сообщения брокер доставит снова
+            logging.warning(f"Не удалось подтвердить события: {e}")
+
+    def consume(self):
+        parameters = pika.ConnectionParameters(
+            host=RABBITMQ_HOST,
+            port=RABBITMQ_PORT,
+            credentials=pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS),
+            heartbeat=RABBITMQ_HEARTBEAT,
+        )
+        connection = pika.BlockingConnection(parameters)
+        channel = connection.channel()
+        channel.exchange_declare(
+            exchange=MIRROR_EVENTS_EXCHANGE, exchange_type="fanout", durable=True
+        )
+        channel.queue_declare(queue=MIRROR_EVENTS_QUEUE, durable=True)
+        channel.queue_bind(queue=MIRROR_EVENTS_QUEUE, exchange=MIRROR_EVENTS_EXCHANGE)
+        channel.basic_qos(prefetch_count=SYNC_PREFETCH)
+        channel.basic_consume(queue=MIRROR_EVENTS_QUEUE, on_message_callback=self.on_message)
+        logging.info(
+            f"Ожидание событий из {MIRROR_EVENTS_EXCHANGE} (очередь {MIRROR_EVENTS_QUEUE}), "
+            f"полная сверка раз в {SYNC_FULL_INTERVAL} с"
+        )
+        self.pending, self.first_pending_at = {}, None
+        while True:
+            connection.process_data_events(time_limit=0.5)
+            self.flush(connection, channel)
+
+    def run(self):
+        while True:
+            try:
+                self.consume()
+            except pika.exceptions.AMQPError as e:
+                logging.error(f"Ошибка соединения с RabbitMQ: {e}")
+            except Exception as e:
+                logging.error(f"Непредвиденная ошибка: {e}")
+            # Без брокера события не приходят - зеркало держится на полной сверке
+            if not self.busy and self.full_sync_due():
+                self.full_sync()
+            logging.info(f"Повторное подключение через {RETRY_DELAY} секунд...")
+            time.sleep(RETRY_DELAY)
+
+
+if __name__ == "__main__":
+    MirrorSync().run()
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Асинхронный origin для медиа зеркала, nginx проксирует на него все запросы файлов.
+
+Попадание в кэш: ответ с X-Accel-Redirect на internal-location /_cache/,
+файл отдаёт сам nginx через sendfile (и Range для прогрессивного MP4 тоже
+обрабатывает он). Без nginx (ORIGIN_ACCEL_REDIRECT=0) файл отдаётся отсюда
+через loop.sendfile, с поддержкой Range.
+
+Промах: файл скачивается fetcher.fetch (объединение одновременных загрузок
+через flock) в пуле из ORIGIN_MAX_FETCHES потоков, байты идут клиенту по мере
+поступления. Если все загрузки заняты дольше ORIGIN_QUEUE_TIMEOUT секунд -
+503. Попадания копятся в памяти и раз в секунду пишутся в индекс кэша, каждый
+запрос HLS запускает предзагрузку следующих сегментов (prefetcher.py). Раз в
+LOCK_SWEEP_INTERVAL секунд удаляются брошенные блокировки неудачных загрузок.
+"""
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, unquote, urlsplit
+
+import cache
+import fetcher
+from prefetcher import prefetcher
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+ORIGIN_HOST = os.getenv("ORIGIN_HOST", "127.0.0.1")
+ORIGIN_PORT = int(os.getenv("ORIGIN_PORT", "8082"))
+ORIGIN_MAX_FETCHES = int(os.getenv("ORIGIN_MAX_FETCHES", "16"))
+ORIGIN_QUEUE_TIMEOUT = float(os.getenv("ORIGIN_QUEUE_TIMEOUT", "10"))
+ORIGIN_ACCEL_REDIRECT = os.getenv("ORIGIN_ACCEL_REDIRECT", "1") == "1"
+# Internal-location nginx с alias на LOCAL_PATH
+ACCEL_PREFIX = "/_cache/"
+MEDIA_PREFIX = os.getenv("MEDIA_PREFIX", "media")
+
+MAX_HEADER_BYTES = 16 * 1024
+HIT_FLUSH_INTERVAL = 1.0
+# Как часто удалять брошенные блокировки загрузок (в любом режиме, не только с кэшем)
+LOCK_SWEEP_INTERVAL = int(os.getenv("LOCK_SWEEP_INTERVAL", "600"))
+HLS_SUFFIXES = (".m3u8", ".ts", ".m4s")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/mp2t", ".ts")
+
+REASONS = {
+    200: "OK",
+    204: "No Content",
+    206: "Partial Content",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    416: "Range Not Satisfiable",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+
+
+class BadRange(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """(start, end) включительно, None - отдать файл целиком. BadRange - 416."""
+    if not header or size is None:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Несколько диапазонов и прочие формы не поддерживаются - отдаём целиком
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise BadRange()
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise BadRange()
+    return start, end
+
+
+class Origin:
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=ORIGIN_MAX_FETCHES, thread_name_prefix="origin-fetch"
+        )
+        self.fetch_slots = None
+        self.pending_hits = {}
+        self.stats = {
+            "requests": 0,
+            "hits": 0,
+            "misses": 0,
+            "active_fetches": 0,
+            "rejected": 0,
+            "errors": 0,
+        }
+
+    async def start(self):
+        self.fetch_slots = asyncio.Semaphore(ORIGIN_MAX_FETCHES)
+        server = await asyncio.start_server(self.handle, ORIGIN_HOST, ORIGIN_PORT)
+        asyncio.create_task(self.flush_hits_forever())
+        asyncio.create_task(self.sweep_locks_forever())
+        logging.info(
+            f"Origin на {ORIGIN_HOST}:{ORIGIN_PORT}, загрузок одновременно {ORIGIN_MAX_FETCHES}, "
+            f"X-Accel-Redirect {'вкл' if ORIGIN_ACCEL_REDIRECT else 'выкл'}"
+        )
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            if len(head) > MAX_HEADER_BYTES:
+                raise ValueError("headers too large")
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            writer.close()
+            return
+
+        self.stats["requests"] += 1
+        try:
+            await self.dispatch(method, target, headers, writer)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            self.stats["errors"] += 1
+            logging.error(f"Ошибка обработки {target}: {e}", exc_info=True)
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def dispatch(self, method, target, headers, writer):
+        if method not in ("GET", "HEAD"):
+            return await self.respond(writer, 405, b"Method not allowed")
+        uri = unquote(urlsplit(target).path)
+        if uri == "/_stats":
+            return await self.respond_stats(writer)
+
+        path = fetcher.normalize(uri)
+        if path is None:
+            return await self.respond(writer, 404, b"File not found")
+        path = f"{MEDIA_PREFIX}/{path}"
+        if path.endswith(HLS_SUFFIXES):
+            prefetcher.notify(path)
+
+        local = fetcher.local_path(path)
+        try:
+            size = os.stat(local).st_size
+        except FileNotFoundError:
+            size = None
+        if size is not None and os.path.isfile(local):
+            self.stats["hits"] += 1
+            self.note_hit(path, size)
+            return await self.serve_hit(method, path, local, size, headers, writer)
+
+        self.stats["misses"] += 1
+        return await self.serve_miss(method, path, headers, writer)
+
+    async def respond(self, writer, status, body=b"", headers=()):
+        head = [f"HTTP/1.1 {status} {REASONS[status]}", "Connection: close"]
+        head += [f"{name}: {value}" for name, value in headers]
+        if body or not any(name == "Content-Length" for name, _ in headers):
+            head.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def respond_stats(self, writer):
+        body = {"enabled": cache.enabled()}
+        if cache.enabled():
+            body.update(
+                await asyncio.get_running_loop().run_in_executor(None, self.cache_stats)
+            )
+        body["origin"] = dict(self.stats)
+        body["prefetch"] = {"pending": prefetcher.pending, "dropped": prefetcher.dropped}
+        await self.respond(
+            writer, 200, json.dumps(body).encode(), [("Content-Type", "application/json")]
+        )
+
+    @staticmethod
+    def cache_stats():
+        db = cache.connect()
+        try:
+            return cache.stats(db)
+        finally:
+            db.close()
+
+    def content_headers(self, path, size, byte_range):
+        headers = [
+            ("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream"),
+            ("Accept-Ranges", "bytes"),
+        ]
+        if byte_range:
+            start, end = byte_range
+            headers += [
+                ("Content-Range", f"bytes {start}-{end}/{size}"),
+                ("Content-Length", end - start + 1),
+            ]
+        elif size is not None:
+            headers.append(("Content-Length", size))
+        return headers
+
+    async def serve_hit(self, method, path, local, size, headers, writer):
+        if ORIGIN_ACCEL_REDIRECT:
+            # Тело, Range и sendfile - на стороне nginx
+            return await self.respond(
+                writer,
+                200,
+                headers=[
+                    ("X-Accel-Redirect", ACCEL_PREFIX + quote(path)),
+                    ("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream"),
+                ],
+            )
+
+        try:
+            byte_range = parse_range(headers.get("range"), size)
+        except BadRange:
+            return await self.respond(writer, 416, headers=[("Content-Range", f"bytes */{size}")])
+        status = 206 if byte_range else 200
+        await self.respond(writer, status, headers=self.content_headers(path, size, byte_range))
+        if method == "HEAD":
+            return
+        start, end = byte_range or (0, size - 1)
+        with open(local, "rb") as f:
+            await asyncio.get_running_loop().sendfile(
+                writer.transport, f, offset=start, count=end - start + 1
+            )
+
+    async def serve_miss(self, method, path, headers, writer):
+        try:
+            await asyncio.wait_for(self.fetch_slots.acquire(), ORIGIN_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            return await self.respond(writer, 503, b"Too many fetches", [("Retry-After", "1")])
+
+        self.stats["active_fetches"] += 1
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=8)
+        cancelled = threading.Event()
+        producer = loop.run_in_executor(
+            self.executor, self.produce, loop, queue, cancelled, path
+        )
+        try:
+            first = await queue.get()
+            if isinstance(first, fetcher.NotFound):
+                return await self.respond(writer, 404, b"File not found")
+            if isinstance(first, Exception):
+                logging.error(f"Не удалось получить {path}: {first}")
+                return await self.respond(writer, 502, b"Upstream fetch failed")
+
+            size = first
+            try:
+                byte_range = parse_range(headers.get("range"), size)
+            except BadRange:
+                return await self.respond(
+                    writer, 416, headers=[("Content-Range", f"bytes */{size}")]
+                )
+            status = 206 if byte_range else 200
+            await self.respond(writer, status, headers=self.content_headers(path, size, byte_range))
+            if method == "HEAD":
+                return
+            await self.stream(queue, writer, byte_range)
+        finally:
+            cancelled.set()
+            # Ведущая загрузка дочитывается в кэш в потоке, слот освобождается по её завершении
+            producer.add_done_callback(lambda _: self.release_fetch())
+
+    def release_fetch(self):
+        self.stats["active_fetches"] -= 1
+        self.fetch_slots.release()
+
+    async def stream(self, queue, writer, byte_range):
+        start, end = byte_range or (0, None)
+        offset = 0
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                logging.error(f"Загрузка прервана: {chunk}")
+                return
+            chunk_end = offset + len(chunk)
+            if chunk_end > start and (end is None or offset <= end):
+                lo = max(start - offset, 0)
+                hi = len(chunk) if end is None else min(len(chunk), end - offset + 1)
+                writer.write(chunk[lo:hi])
+                await writer.drain()
+            offset = chunk_end
+            if end is not None and offset > end:
+                return
+
+    @staticmethod
+    def produce(loop, queue, cancelled, path):
+        """Поток пула: fetch и передача байтов в корутину с учётом её темпа."""
+
+        def put(item):
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while not cancelled.is_set():
+                try:
+                    future.result(timeout=1)
+                    return True
+                except TimeoutError:
+                    continue
+            future.cancel()
+            return False
+
+        try:
+            result = fetcher.fetch(path)
+        except fetcher.FetchError as e:
+            put(e)
+            return
+        if not put(result.size):
+            result.close()
+            return
+        try:
+            for chunk in result.chunks():
+                if not put(chunk):
+                    # Клиент ушёл: загрузка ведущего докачивается в кэш
+                    result.close()
+                    return
+            put(None)
+        except fetcher.FetchError as e:
+            put(e)
+
+    def note_hit(self, path, size):
+        if not cache.enabled():
+            return
+        _, _, count = self.pending_hits.get(path, (size, 0, 0))
+        self.pending_hits[path] = (size, time.time(), count + 1)
+
+    async def flush_hits_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(HIT_FLUSH_INTERVAL)
+            if not self.pending_hits:
+                continue
+            hits, self.pending_hits = self.pending_hits, {}
+            try:
+                await loop.run_in_executor(None, self.flush_hits, hits)
+            except Exception as e:
+                logging.warning(f"Не удалось записать попадания в индекс кэша: {e}")
+
+    async def sweep_locks_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                removed = await loop.run_in_executor(None, fetcher.sweep_locks)
+            except Exception as e:
+                logging.warning(f"Не удалось удалить брошенные блокировки: {e}")
+            else:
+                if removed:
+                    logging.info(f"Удалено брошенных файлов блокировок: {removed}")
+            await asyncio.sleep(LOCK_SWEEP_INTERVAL)
+
+    @staticmethod
+    def flush_hits(hits):
+        db = cache.connect()
+        try:
+            cache.record_accesses(db, hits)
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(Origin().start())
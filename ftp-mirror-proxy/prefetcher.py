@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Предзагрузка следующих HLS-сегментов в локальный кэш.
+
+origin.py сообщает (notify) о каждом запросе плейлиста или сегмента. По
+запросу сегмента N находится его плейлист варианта и в фоне скачиваются
+сегменты N+1..N+k через fetcher (те же блокировки, что у промахов клиентов,
+так что загрузки не дублируются). По запросу плейлиста варианта прогреваются
+первые k сегментов.
+
+k подстраивается под темп запросов варианта относительно длительности
+сегмента (#EXT-X-TARGETDURATION): при ровном просмотре плеер просит один
+сегмент за его длительность, и впереди держится PREFETCH_MIN сегментов; во
+сколько раз темп выше (быстрый старт, перемотка), во столько раз больше
+окно, но не больше PREFETCH_MAX.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import fetcher
+
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+PREFETCH_MIN = int(os.getenv("PREFETCH_MIN", "2"))
+PREFETCH_MAX = int(os.getenv("PREFETCH_MAX", "10"))
+# Длительность сегмента, если в плейлисте нет #EXT-X-TARGETDURATION (HLS_TIME транскодера)
+PREFETCH_SEGMENT_SECONDS = float(os.getenv("PREFETCH_SEGMENT_SECONDS", "2"))
+# Задач в очереди пула не больше этого, лишние отбрасываются: предзагрузка не должна отставать
+PREFETCH_QUEUE_MAX = int(os.getenv("PREFETCH_QUEUE_MAX", "64"))
+
+# Темп считается по последним RATE_SAMPLES запросам варианта не старше RATE_WINDOW секунд
+RATE_SAMPLES = 16
+RATE_WINDOW = 60
+# Повтор того же URI за это время не считается новым запросом
+DUPLICATE_WINDOW = 1.0
+MAX_TRACKED = 10000
+
+SEGMENT_RE = re.compile(r"^(?P<rendition>.+)_\d+\.(ts|m4s|mp4)$")
+
+
+class RequestRate:
+    """Темп запросов (в секунду) по ключу варианта, LRU по числу ключей."""
+
+    def __init__(self):
+        self._samples = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, key, now):
+        with self._lock:
+            samples = self._samples.pop(key, None) or deque(maxlen=RATE_SAMPLES)
+            self._samples[key] = samples
+            while len(self._samples) > MAX_TRACKED:
+                self._samples.popitem(last=False)
+            while samples and now - samples[0] > RATE_WINDOW:
+                samples.popleft()
+            samples.append(now)
+            if len(samples) < 2 or samples[-1] == samples[0]:
+                return None
+            return (len(samples) - 1) / (samples[-1] - samples[0])
+
+
+def window(rate, segment_seconds=PREFETCH_SEGMENT_SECONDS):
+    """rate - сегментов в секунду; 1 сегмент за segment_seconds - ровный просмотр."""
+    if rate is None:
+        return PREFETCH_MIN
+    speedup = rate * segment_seconds
+    return max(PREFETCH_MIN, min(PREFETCH_MAX, round(PREFETCH_MIN * speedup)))
+
+
+class PlaylistIndex:
+    """
+    Разобранные плейлисты вариантов (имена сегментов по порядку и
+    #EXT-X-TARGETDURATION) с учётом mtime файла.
+    """
+
+    def __init__(self):
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def segments(self, path):
+        local = fetcher.local_path(path)
+        try:
+            mtime = os.stat(local).st_mtime
+        except FileNotFoundError:
+            fetcher.fetch(path, prefetch=True).close()
+            mtime = os.stat(local).st_mtime
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        names, duration = self._parse(local)
+        with self._lock:
+            self._cache[path] = (mtime, names, duration)
+            while len(self._cache) > MAX_TRACKED:
+                self._cache.popitem(last=False)
+        return names
+
+    def segment_seconds(self, path):
+        with self._lock:
+            cached = self._cache.get(path)
+        return (cached and cached[2]) or PREFETCH_SEGMENT_SECONDS
+
+    @staticmethod
+    def _parse(local):
+        with open(local, encoding="utf-8", errors="replace") as f:
+            lines = [line.strip() for line in f]
+        if any(line.startswith("#EXT-X-STREAM-INF") for line in lines):
+            return None, None  # мастер-плейлист
+        names = [line for line in lines if line and not line.startswith("#")]
+        duration = PREFETCH_SEGMENT_SECONDS
+        for line in lines:
+            if line.startswith("#EXT-X-TARGETDURATION:"):
+                try:
+                    duration = float(line.split(":", 1)[1]) or duration
+                except ValueError:
+                    pass
+                break
+        return names, duration
+
+
+class Prefetcher:
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+        self.rates = RequestRate()
+        self.playlists = PlaylistIndex()
+        self.inflight = set()
+        self.recent = OrderedDict()
+        self.pending = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def notify(self, path):
+        """path - нормализованный путь относительно LOCAL_PATH (media/...)."""
+        now = time.monotonic()
+        with self._lock:
+            last = self.recent.pop(path, None)
+            self.recent[path] = now
+            while len(self.recent) > MAX_TRACKED:
+                self.recent.popitem(last=False)
+        if last is not None and now - last < DUPLICATE_WINDOW:
+            return
+        self._submit(self._plan, path, now)
+
+    def _submit(self, func, *args):
+        with self._lock:
+            if self.pending >= PREFETCH_QUEUE_MAX:
+                self.dropped += 1
+                return False
+            self.pending += 1
+        self.executor.submit(self._run, func, *args)
+        return True
+
+    def _run(self, func, *args):
+        try:
+            func(*args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def _plan(self, path, now):
+        directory, name = path.rsplit("/", 1)
+        try:
+            if name.endswith(".m3u8"):
+                playlist, position = path, -1
+                segments = self.playlists.segments(playlist)
+            else:
+                match = SEGMENT_RE.match(name)
+                if not match:
+                    return
+                playlist = f"{directory}/{match['rendition']}.m3u8"
+                segments = self.playlists.segments(playlist)
+                if not segments or name not in segments:
+                    return
+                position = segments.index(name)
+        except (OSError, fetcher.FetchError) as e:
+            logging.debug(f"Нет плейлиста для {path}: {e}")
+            return
+        if not segments:
+            return
+
+        k = window(self.rates.observe(playlist, now), self.playlists.segment_seconds(playlist))
+        for segment in segments[position + 1 : position + 1 + k]:
+            self._warm(f"{directory}/{segment}")
+
+    def _warm(self, path):
+        if os.path.isfile(fetcher.local_path(path)):
+            return
+        with self._lock:
+            if path in self.inflight:
+                return
+            self.inflight.add(path)
+        if not self._submit(self._fetch, path):
+            with self._lock:
+                self.inflight.discard(path)
+
+    def _fetch(self, path):
+        try:
+            fetcher.fetch(path, prefetch=True).close()
+        except fetcher.FetchError as e:
+            logging.warning(f"Предзагрузка {path} не удалась: {e}")
+        finally:
+            with self._lock:
+                self.inflight.discard(path)
+
+
+prefetcher = Prefetcher()
+
@@ -1,9 +1,20 @@
 #!/bin/sh
 
 
-/usr/local/bin/periodic_sync.sh &
+# С RabbitMQ - синхронизация по событиям об изменениях и редкая полная сверка,
+# без него - полный обход дерева каждые SYNC_INTERVAL секунд
+if [ -n "$RABBITMQ_HOST" ] && [ -n "${MIRROR_EVENTS_EXCHANGE-mirror_events}" ]; then
+    /usr/local/bin/mirror_sync.py &
+else
+    /usr/local/bin/periodic_sync.sh &
+fi
 
-spawn-fcgi -s /var/run/fcgiwrap.socket -F 1 -U www-data -G www-data /usr/sbin/fcgiwrap
-chmod 777 /var/run/fcgiwrap.socket
+# Ограниченный кэш: сверка индекса с диском и вытеснение
+if [ "${CACHE_MAX_BYTES:-0}" -gt 0 ]; then
+    /usr/local/bin/cache_manager.py &
+fi
+
+# Отдача файлов и загрузка промахов с FTP (nginx проксирует на 127.0.0.1:8082)
+/usr/local/bin/origin.py &
 
 nginx -g "daemon off;"
\ No newline at end of file
@@ -1,4 +1,6 @@
 #!/bin/sh
+# sync.sh [путь] - без аргумента зеркалирует всё дерево FTP, с аргументом -
+# только поддерево (путь относительно FTP_PATH, например media/movies/12).
 
 set -e
 
@@ -7,12 +9,64 @@ FTP_USER_NAME=${FTP_USER_NAME:?FTP_USER_NAME not set}
 FTP_USER_PASS=${FTP_USER_PASS:?FTP_USER_PASS not set}
 FTP_PATH=${FTP_USER_NAME_HOME:-/}
 LOCAL_PATH=${LOCAL_PATH:-/usr/share/nginx/files}
+SYNC_PARALLEL=${SYNC_PARALLEL:-4}
 
-echo "🔄 Синхронизация с ftp://$FTP_HOST$FTP_PATH в $LOCAL_PATH" >&2
+# Ограниченный кэш (CACHE_MAX_BYTES) наполняется по запросам, синхронизация
+# только обновляет и удаляет уже закэшированные файлы
+ONLY_EXISTING=""
+if [ "${CACHE_MAX_BYTES:-0}" -gt 0 ]; then
+    ONLY_EXISTING="--only-existing"
+fi
 
-lftp -u "$FTP_USER_NAME","$FTP_USER_PASS" "$FTP_HOST" <<EOF
-mirror --verbose --delete --only-newer "$FTP_PATH" "$LOCAL_PATH"
+SUBPATH=$(echo "${1:-}" | sed -E 's#^/+##; s#/+$##')
+case "/$SUBPATH/" in
+    */../*|*/./*)
+        echo "Ошибка: недопустимый путь '$1'" >&2
+        exit 2
+        ;;
+esac
+
+REMOTE_DIR="$FTP_PATH"
+LOCAL_DIR="$LOCAL_PATH"
+if [ -n "$SUBPATH" ]; then
+    REMOTE_DIR="${FTP_PATH%/}/$SUBPATH"
+    LOCAL_DIR="$LOCAL_PATH/$SUBPATH"
+    mkdir -p "$LOCAL_DIR"
+fi
+
+echo "🔄 Синхронизация с ftp://$FTP_HOST$REMOTE_DIR в $LOCAL_DIR" >&2
+
+# Папки REMOTE_DIR нет на FTP: ответ 550 именно на cd в неё
+remote_dir_missing() {
+    if CD_OUTPUT=$(lftp -u "$FTP_USER_NAME","$FTP_USER_PASS" "$FTP_HOST" 2>&1 <<EOF
+set cmd:fail-exit yes
+set cmd:verify-path yes
+cd "$REMOTE_DIR"
+quit
+EOF
+    ); then
+        return 1
+    fi
+    echo "$CD_OUTPUT" >&2
+    echo "$CD_OUTPUT" | grep -q "^cd: .*[^0-9]550[^0-9]"
+}
+
+if ! OUTPUT=$(lftp -u "$FTP_USER_NAME","$FTP_USER_PASS" "$FTP_HOST" 2>&1 <<EOF
+set cmd:fail-exit yes
+mirror --verbose --delete --only-newer --parallel=$SYNC_PARALLEL $ONLY_EXISTING --exclude-glob .fetch-tmp/ "$REMOTE_DIR" "$LOCAL_DIR"
 quit
 EOF
+); then
+    echo "$OUTPUT" >&2
+    # Папки больше нет на FTP (фильм удалён) - удаляем и локальную копию.
+    # Прочие сбои (таймаут, обрыв) локальную копию не трогают.
+    if [ -n "$SUBPATH" ] && remote_dir_missing; then
+        rm -rf "$LOCAL_DIR"
+        echo "🗑 $REMOTE_DIR отсутствует на FTP, локальная копия удалена" >&2
+        exit 0
+    fi
+    exit 1
+fi
+echo "$OUTPUT" >&2
 
-echo "✅ Синхронизация завершена"
\ No newline at end of file
+echo "✅ Синхронизация завершена"
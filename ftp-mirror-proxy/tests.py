@@ -0,0 +1,62 @@
+"""Тесты ftp-mirror-proxy: python3 -m unittest tests (из каталога ftp-mirror-proxy)."""
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault("LOCAL_PATH", tempfile.mkdtemp(prefix="mirror-test-"))
+
+import fetcher  # noqa: E402
+import prefetcher  # noqa: E402
+
+
+class ContendedFetchTests(unittest.TestCase):
+    """Путь уже качает другой процесс: предзагрузка сразу возвращает пустой результат."""
+
+    path = "media/movies/1/transcoded/m_180_003.ts"
+
+    def setUp(self):
+        name = fetcher.hashlib.sha1(self.path.encode()).hexdigest()
+        self.leader = fetcher._Lock(name)
+        self.assertTrue(self.leader.try_acquire())
+
+    def tearDown(self):
+        self.leader.release()
+        self.leader.close()
+
+    def test_prefetch_returns_empty_result(self):
+        result = fetcher.fetch(self.path, prefetch=True)
+        self.assertIsNone(result.size)
+        self.assertEqual(list(result.chunks()), [])
+        result.close()
+
+    def test_prefetcher_fetch_does_not_raise(self):
+        p = prefetcher.Prefetcher()
+        p.inflight.add(self.path)
+        p._fetch(self.path)
+        self.assertNotIn(self.path, p.inflight)
+
+
+class PrefetchWindowTests(unittest.TestCase):
+    def test_steady_playback_keeps_small_window(self):
+        # Один двухсекундный сегмент каждые 2 с, с небольшим разбросом
+        self.assertEqual(prefetcher.window(0.5, 2), prefetcher.PREFETCH_MIN)
+        self.assertEqual(prefetcher.window(0.55, 2), prefetcher.PREFETCH_MIN)
+        self.assertEqual(prefetcher.window(1 / 6, 6), prefetcher.PREFETCH_MIN)
+
+    def test_fast_start_grows_window(self):
+        # Старт плеера: несколько сегментов в секунду
+        self.assertEqual(prefetcher.window(5, 2), prefetcher.PREFETCH_MAX)
+        self.assertGreater(prefetcher.window(1, 2), prefetcher.PREFETCH_MIN)
+
+    def test_unknown_rate(self):
+        self.assertEqual(prefetcher.window(None), prefetcher.PREFETCH_MIN)
+
+    def test_target_duration_from_playlist(self):
+        index = prefetcher.PlaylistIndex()
+        path = "media/movies/2/transcoded/m_360.m3u8"
+        local = fetcher.local_path(path)
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        with open(local, "w") as f:
+            f.write("#EXTM3U\n#EXT-X-TARGETDURATION:6\n#EXTINF:6.0,\nm_360_000.ts\n")
+        self.assertEqual(index.segments(path), ["m_360_000.ts"])
+        self.assertEqual(index.segment_seconds(path), 6)
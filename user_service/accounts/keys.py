@@ -0,0 +1,139 @@
+import json
+import logging
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from django.conf import settings
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+
+class SigningKey:
+    def __init__(self, kid, private_key=None, public_key=None):
+        self.kid = kid
+        self.private_key = private_key
+        self.public_key = public_key or private_key.public_key()
+        self.algorithm = self._algorithm(self.public_key)
+
+    @staticmethod
+    def _algorithm(public_key):
+        if isinstance(public_key, rsa.RSAPublicKey):
+            return "RS256"
+        if isinstance(public_key, ec.EllipticCurvePublicKey) and public_key.curve.name == "secp256r1":
+            return "ES256"
+        raise ValueError(f"Неподдерживаемый тип ключа: {type(public_key).__name__}")
+
+    def pem(self, private=False):
+        if private:
+            return self.private_key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            ).decode()
+        return self.public_key.public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        ).decode()
+
+    def jwk(self):
+        algorithm = jwt.algorithms.get_default_algorithms()[self.algorithm]
+        data = json.loads(algorithm.to_jwk(self.public_key))
+        data.update({"kid": self.kid, "alg": self.algorithm, "use": "sig"})
+        return data
+
+
+class SigningKeyRing:
+    """
+    Набор ключей подписи из JWT_SIGNING_KEYS_DIR: каждый <kid>.pem - приватный
+    ключ (RSA или EC P-256), которым можно подписывать, либо публичный ключ
+    выведенного из оборота ключа, по которому ещё проверяются старые токены.
+    Подписывает ключ JWT_ACTIVE_KID, по умолчанию последний по имени приватный.
+    """
+
+    def __init__(self, directory, active_kid=None):
+        self.keys = {}
+        for path in sorted(Path(directory).glob("*.pem")):
+            data = path.read_bytes()
+            try:
+                key = SigningKey(path.stem, private_key=serialization.load_pem_private_key(data, None))
+            except ValueError:
+                key = SigningKey(path.stem, public_key=serialization.load_pem_public_key(data))
+            self.keys[key.kid] = key
+
+        signing = [kid for kid, key in self.keys.items() if key.private_key]
+        if not signing:
+            raise ValueError(f"В {directory} нет приватных ключей для подписи JWT")
+        self.active_kid = active_kid or signing[-1]
+        if self.active_kid not in signing:
+            raise ValueError(f"Активный ключ {self.active_kid} не найден среди приватных")
+        logger.info(f"Ключи JWT: {sorted(self.keys)}, подпись ключом {self.active_kid}")
+
+    def jwks(self):
+        return {"keys": [key.jwk() for key in self.keys.values()]}
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """Подписывает активным ключом с kid в заголовке, проверяет ключом из kid токена."""
+
+    def __init__(self, key_ring):
+        active = key_ring.keys[key_ring.active_kid]
+        super().__init__(
+            active.algorithm,
+            active.pem(private=True),
+            active.pem(),
+            api_settings.AUDIENCE,
+            api_settings.ISSUER,
+            None,
+            api_settings.LEEWAY,
+            api_settings.JSON_ENCODER,
+        )
+        self.key_ring = key_ring
+        self._verifiers = {
+            kid: TokenBackend(
+                key.algorithm,
+                None,
+                key.pem(),
+                api_settings.AUDIENCE,
+                api_settings.ISSUER,
+                None,
+                api_settings.LEEWAY,
+            )
+            for kid, key in key_ring.keys.items()
+        }
+
+    def encode(self, payload):
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload["aud"] = self.audience
+        if self.issuer is not None:
+            jwt_payload["iss"] = self.issuer
+        return jwt.encode(
+            jwt_payload,
+            self.signing_key,
+            algorithm=self.algorithm,
+            headers={"kid": self.key_ring.active_kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def decode(self, token, verify=True):
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError("Token is invalid") from e
+        verifier = self._verifiers.get(kid)
+        if verifier is None:
+            raise TokenBackendError("Token is invalid")
+        return verifier.decode(token, verify=verify)
+
+
+key_ring = (
+    SigningKeyRing(settings.JWT_SIGNING_KEYS_DIR, settings.JWT_ACTIVE_KID or None)
+    if settings.JWT_SIGNING_KEYS_DIR
+    else None
+)
+token_backend = KeyRingTokenBackend(key_ring) if key_ring else None
@@ -24,8 +24,31 @@ class User(AbstractBaseUser, PermissionsMixin):
     username = models.CharField(max_length=150, unique=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Растёт при каждом изменении прав, по нему сервисы узнают устаревшие токены
+    privileges_version = models.PositiveIntegerField(default=0)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
-    REQUIRED_FIELDS = ['username']
\ No newline at end of file
+    REQUIRED_FIELDS = ['username']
+
+    PRIVILEGE_FIELDS = ('is_active', 'is_staff', 'is_superuser')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_privileges = instance._privileges()
+        return instance
+
+    def _privileges(self):
+        return tuple(getattr(self, field) for field in self.PRIVILEGE_FIELDS)
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_privileges', None)
+        if loaded is not None and loaded != self._privileges():
+            self.privileges_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'privileges_version'}
+        super().save(*args, **kwargs)
+        self._loaded_privileges = self._privileges()
\ No newline at end of file
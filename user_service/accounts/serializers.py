@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import User
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from .tokens import PrivilegedRefreshToken
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -35,3 +37,7 @@ class LoginSerializer(serializers.Serializer):
         if user and user.is_active:
             return user
         raise serializers.ValidationError("Invalid login credentials")
+
+
+class PrivilegedTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = PrivilegedRefreshToken
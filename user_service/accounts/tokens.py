@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.state import token_backend as default_token_backend
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .keys import token_backend as key_ring_token_backend
+
+
+class KeyRingTokenMixin:
+    """Подписывает и проверяет токены набором ключей из JWT_SIGNING_KEYS_DIR, если он задан."""
+
+    @property
+    def token_backend(self):
+        return key_ring_token_backend or default_token_backend
+
+    def get_token_backend(self):
+        return self.token_backend
+
+
+class SignedAccessToken(KeyRingTokenMixin, AccessToken):
+    pass
+
+
+class PrivilegedRefreshToken(KeyRingTokenMixin, RefreshToken):
+    """
+    Refresh-токен, чей access-токен при JWT_PRIVILEGE_CLAIMS содержит актуальные
+    права пользователя и их версию. Права читаются из БД при каждом выпуске
+    access-токена, поэтому обновление токена подхватывает изменения.
+    """
+
+    access_token_class = SignedAccessToken
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        if settings.JWT_PRIVILEGE_CLAIMS:
+            user = (
+                get_user_model()
+                .objects.filter(pk=self[api_settings.USER_ID_CLAIM])
+                .values('is_staff', 'is_superuser', 'privileges_version')
+                .first()
+            )
+            if user:
+                access['is_staff'] = user['is_staff']
+                access['is_superuser'] = user['is_superuser']
+                access['priv_ver'] = user['privileges_version']
+        return access
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import RegisterView, LoginView, TokenRefreshView,  MeView, PrivilegesView
+from .views import RegisterView, LoginView, TokenRefreshView,  MeView, PrivilegesView, JWKSView
 # from .views import LogoutView
 from rest_framework_simplejwt.views import TokenRefreshView
 
@@ -10,4 +10,5 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('me/', MeView.as_view(), name='me'),
     path('privileges/', PrivilegesView.as_view(), name='rights'),
+    path('.well-known/jwks.json', JWKSView.as_view(), name='jwks'),
 ]
\ No newline at end of file
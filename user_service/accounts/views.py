@@ -1,10 +1,11 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import PrivilegedRefreshToken
+from .keys import key_ring
 from .serializers import RegisterSerializer, LoginSerializer
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth import get_user_model
 
 class RegisterView(APIView):
@@ -20,7 +21,7 @@ class LoginView(APIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data
 
-        refresh = RefreshToken.for_user(user)
+        refresh = PrivilegedRefreshToken.for_user(user)
         refresh['email'] = user.email
         refresh['username'] = user.username
         refresh['user_id'] = user.id
@@ -37,7 +38,7 @@ class TokenRefreshView(APIView):
         if not refresh_token:
             return Response({'error': 'Refresh token is required'}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            refresh = RefreshToken(refresh_token)
+            refresh = PrivilegedRefreshToken(refresh_token)
             new_access_token = str(refresh.access_token)
             return Response({'access': new_access_token}, status=status.HTTP_200_OK)
         except Exception as e:
@@ -77,4 +78,15 @@ class PrivilegesView(APIView):
         return Response({
             "is_staff": user.is_staff,
             "is_superuser": user.is_superuser,
-        })
\ No newline at end of file
+            "privileges_version": user.privileges_version,
+        })
+
+class JWKSView(APIView):
+    """Публичные ключи проверки JWT. Пустой набор, если токены подписываются HS256."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        response = Response(key_ring.jwks() if key_ring else {"keys": []})
+        response["Cache-Control"] = "public, max-age=300"
+        return response
@@ -78,8 +78,21 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.PrivilegedTokenRefreshSerializer',
+    'AUTH_TOKEN_CLASSES': ('accounts.tokens.SignedAccessToken',),
 }
 
+# Папка с ключами подписи JWT (<kid>.pem, RSA или EC P-256). Если задана, токены
+# подписываются асимметрично, а публичные ключи отдаются на /.well-known/jwks.json.
+# Пусто - HS256 с общим JWT_SECRET_KEY, как раньше
+JWT_SIGNING_KEYS_DIR = os.getenv('JWT_SIGNING_KEYS_DIR', '')
+# kid ключа для подписи новых токенов, по умолчанию последний по имени
+JWT_ACTIVE_KID = os.getenv('JWT_ACTIVE_KID', '')
+
+# Класть права пользователя (is_staff, is_superuser, priv_ver) в access-токен,
+# чтобы сервисы проверяли их без запроса к /privileges/
+JWT_PRIVILEGE_CLAIMS = os.getenv('JWT_PRIVILEGE_CLAIMS', 'False').lower() == 'true'
+
 
 
 ROOT_URLCONF = 'user_service.urls'
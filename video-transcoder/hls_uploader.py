@@ -0,0 +1,200 @@
+import os
+import queue
+import logging
+import threading
+import time
+import ftputil
+
+POLL_INTERVAL = float(os.getenv("SEGMENT_POLL_INTERVAL", "1"))
+# Параллельных FTP-соединений на загрузку, у каждого своё соединение
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+# Попыток на один файл и базовая пауза между ними (удваивается)
+UPLOAD_RETRIES = int(os.getenv("UPLOAD_RETRIES", "3"))
+UPLOAD_RETRY_BACKOFF = float(os.getenv("UPLOAD_RETRY_BACKOFF", "1"))
+# Сколько abort() ждёт потоки, прежде чем temp_dir будет удалён
+ABORT_JOIN_TIMEOUT = float(os.getenv("UPLOAD_ABORT_JOIN_TIMEOUT", "30"))
+
+
+class SegmentUploader:
+    """
+    Загружает готовые HLS-сегменты на FTP, пока ffmpeg ещё кодирует.
+
+    ffmpeg запускается с hls_flags temp_file: сегмент пишется в .ts.tmp и
+    переименовывается в .ts только целиком, поэтому любой .ts в temp_dir
+    уже дописан. После подтверждённой загрузки локальная копия удаляется,
+    так что на диске остаются только ещё не выгруженные сегменты.
+
+    Сегменты разбирают workers потоков, у каждого своё FTP-соединение.
+    Неудачная загрузка повторяется до retries раз с растущей паузой, при
+    обрыве соединение переоткрывается; остальные файлы при этом не перезаливаются.
+    """
+
+    def __init__(
+        self,
+        temp_dir,
+        remote_dir,
+        ftp_host,
+        ftp_user,
+        ftp_pass,
+        workers=None,
+        retries=None,
+        backoff=None,
+    ):
+        self.temp_dir = temp_dir
+        self.remote_dir = remote_dir
+        self.ftp_args = (ftp_host, ftp_user, ftp_pass)
+        self.workers = max(1, workers or UPLOAD_WORKERS)
+        self.retries = max(1, retries or UPLOAD_RETRIES)
+        self.backoff = UPLOAD_RETRY_BACKOFF if backoff is None else backoff
+
+        self._queue = queue.Queue()
+        self._seen = set()
+        self._stop = threading.Event()
+        self._aborted = threading.Event()
+        self._lock = threading.Lock()
+        self._errors = []
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+        self._threads = [
+            threading.Thread(target=self._upload_loop, daemon=True)
+            for _ in range(self.workers)
+        ]
+        self._started = None
+        self.uploaded = 0
+        self.bytes_uploaded = 0
+        self.retried = 0
+        # Размеры загруженных сегментов: локальные копии удаляются, а они нужны мастер-плейлисту
+        self.segment_sizes = {}
+
+    def start(self):
+        self._started = time.monotonic()
+        self._watcher.start()
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def finish(self):
+        """Дожидается загрузки всех сегментов. Бросает исключение, если что-то не загрузилось."""
+        self._stop.set()
+        self._watcher.join()
+        self._scan()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        if self._errors:
+            raise Exception(f"Не удалось загрузить файлы: {self._errors}")
+        stats = self.stats()
+        logging.info(
+            f"Загружено сегментов на FTP: {stats['files']}, "
+            f"{stats['bytes'] / 1024 / 1024:.1f} МБ за {stats['seconds']:.1f} с "
+            f"({stats['mbps']:.1f} Мбит/с, {self.workers} соединений, повторов: {stats['retried']})"
+        )
+
+    def abort(self, timeout=ABORT_JOIN_TIMEOUT):
+        """Останавливает загрузку и ждёт потоки: после возврата temp_dir можно удалять."""
+        self._aborted.set()
+        self._stop.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        if self._started is None:
+            return
+        deadline = time.monotonic() + timeout
+        for thread in [self._watcher, *self._threads]:
+            thread.join(max(0, deadline - time.monotonic()))
+        alive = sum(thread.is_alive() for thread in [self._watcher, *self._threads])
+        if alive:
+            logging.warning(f"Потоков загрузки не завершилось за {timeout:.0f} с: {alive}")
+
+    def stats(self):
+        seconds = time.monotonic() - self._started if self._started else 0
+        with self._lock:
+            return {
+                "files": self.uploaded,
+                "bytes": self.bytes_uploaded,
+                "retried": self.retried,
+                "failed": len(self._errors),
+                "seconds": seconds,
+                "mbps": self.bytes_uploaded * 8 / 1e6 / seconds if seconds else 0,
+            }
+
+    def upload_now(self, local_paths):
+        """Синхронная загрузка файлов (плейлисты после окончания кодирования)."""
+        ftp = None
+        try:
+            for local_path in local_paths:
+                remote_path = f"{self.remote_dir}/{os.path.basename(local_path)}"
+                ftp = self._upload_with_retry(ftp, local_path, remote_path)
+                logging.info(f"Загружен файл: {remote_path}")
+        finally:
+            if ftp is not None:
+                self._close(ftp)
+
+    def _watch(self):
+        while not self._stop.wait(POLL_INTERVAL):
+            self._scan()
+
+    def _scan(self):
+        for name in sorted(os.listdir(self.temp_dir)):
+            if name.endswith('.ts') and name not in self._seen:
+                self._seen.add(name)
+                self._queue.put(name)
+
+    def _upload_loop(self):
+        ftp = None
+        try:
+            while True:
+                name = self._queue.get()
+                if name is None or self._aborted.is_set():
+                    return
+                local_path = os.path.join(self.temp_dir, name)
+                size = os.path.getsize(local_path)
+                try:
+                    ftp = self._upload_with_retry(
+                        ftp, local_path, f"{self.remote_dir}/{name}"
+                    )
+                except Exception as e:
+                    logging.error(f"Ошибка при загрузке файла {name}: {e}")
+                    ftp = None
+                    with self._lock:
+                        self._errors.append(name)
+                    continue
+                os.remove(local_path)
+                with self._lock:
+                    self.uploaded += 1
+                    self.bytes_uploaded += size
+                    self.segment_sizes[name] = size
+                logging.debug(f"Загружен сегмент: {name}")
+        finally:
+            if ftp is not None:
+                self._close(ftp)
+
+    def _upload_with_retry(self, ftp, local_path, remote_path):
+        """Загружает файл, при ошибке переподключается. Возвращает рабочее соединение."""
+        for attempt in range(1, self.retries + 1):
+            try:
+                if ftp is None:
+                    ftp = ftputil.FTPHost(*self.ftp_args)
+                ftp.upload(local_path, remote_path)
+                return ftp
+            except Exception as e:
+                if ftp is not None:
+                    self._close(ftp)
+                    ftp = None
+                if attempt == self.retries or self._aborted.is_set():
+                    raise
+                delay = self.backoff * 2 ** (attempt - 1)
+                logging.warning(
+                    f"Ошибка загрузки {remote_path} (попытка {attempt}/{self.retries}): {e}. "
+                    f"Повтор через {delay:.1f} с"
+                )
+                with self._lock:
+                    self.retried += 1
+                if self._aborted.wait(delay):
+                    raise
+
+    @staticmethod
+    def _close(ftp):
+        try:
+            ftp.close()
+        except Exception:
+            pass
@@ -0,0 +1,164 @@
+import os
+import re
+import logging
+import subprocess
+
+# Стратегия выбора лестницы: fixed - стандартные битрейты, per_title - с учётом сложности
+LADDER_ENGINE = os.getenv("LADDER_ENGINE", "fixed")
+# Пробные отрезки для оценки сложности: количество и длина в секундах
+COMPLEXITY_SAMPLES = int(os.getenv("COMPLEXITY_SAMPLES", "3"))
+COMPLEXITY_SAMPLE_SECONDS = int(os.getenv("COMPLEXITY_SAMPLE_SECONDS", "5"))
+# Битрейт пробного CRF-кодирования 480p, при котором лестница не меняется
+COMPLEXITY_REFERENCE_KBPS = int(os.getenv("COMPLEXITY_REFERENCE_KBPS", "1000"))
+COMPLEXITY_MIN_FACTOR = float(os.getenv("COMPLEXITY_MIN_FACTOR", "0.5"))
+COMPLEXITY_MAX_FACTOR = float(os.getenv("COMPLEXITY_MAX_FACTOR", "1.5"))
+
+DEFAULT_LADDER = [
+    {'name': '480', 'height': 480, 'bitrate': 1000},
+    {'name': '720', 'height': 720, 'bitrate': 2500},
+    {'name': '1080', 'height': 1080, 'bitrate': 5000},
+]
+
+SEGMENT_PATTERN = re.compile(r'^#EXTINF:([\d.]+)')
+
+
+def scaled_width(source, height):
+    """Ширина, которую даст scale=-2:<height>."""
+    if not source['width'] or not source['height']:
+        return None
+    return round(height * source['width'] / (source['height'] * 2)) * 2
+
+
+def fit_to_source(ladder, source):
+    """
+    Отбрасывает разрешения выше исходного. Если исходник меньше всех ступеней,
+    остаётся одна ступень с высотой исходника и пропорционально меньшим битрейтом.
+    """
+    if not source['height']:
+        return [dict(rendition) for rendition in ladder]
+
+    fitted = [dict(r) for r in ladder if r['height'] <= source['height']]
+    if fitted:
+        return fitted
+
+    lowest = min(ladder, key=lambda r: r['height'])
+    height = source['height'] - source['height'] % 2
+    return [{
+        'name': str(height),
+        'height': height,
+        'bitrate': max(1, round(lowest['bitrate'] * height / lowest['height'])),
+    }]
+
+
+def measure_complexity(source_url, duration):
+    """
+    Быстро кодирует несколько отрезков в 480p с постоянным качеством (CRF)
+    и возвращает средний битрейт в кбит/с: чем сложнее картинка, тем он выше.
+    """
+    samples = max(1, COMPLEXITY_SAMPLES)
+    length = COMPLEXITY_SAMPLE_SECONDS
+    if duration <= length * samples:
+        starts = [0]
+        length = duration
+    else:
+        step = duration / (samples + 1)
+        starts = [int(step * (i + 1)) for i in range(samples)]
+
+    total_bytes = 0
+    total_seconds = 0
+    for start in starts:
+        cmd = [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-ss', str(start), '-i', source_url, '-t', str(length),
+            '-map', '0:v:0', '-an',
+            '-vf', 'scale=-2:480',
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '23',
+            '-f', 'mpegts', 'pipe:1',
+        ]
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise Exception(f"Ошибка анализа сложности: {result.stderr.decode(errors='replace')}")
+        total_bytes += len(result.stdout)
+        total_seconds += length
+
+    return total_bytes * 8 / 1000 / total_seconds if total_seconds else 0
+
+
+def fixed_ladder(source, source_url):
+    return fit_to_source(DEFAULT_LADDER, source)
+
+
+def per_title_ladder(source, source_url):
+    ladder = fit_to_source(DEFAULT_LADDER, source)
+    try:
+        kbps = measure_complexity(source_url, source['duration'])
+    except Exception as e:
+        logging.error(f"{e}. Используются стандартные битрейты")
+        return ladder
+
+    factor = kbps / COMPLEXITY_REFERENCE_KBPS
+    factor = min(COMPLEXITY_MAX_FACTOR, max(COMPLEXITY_MIN_FACTOR, factor))
+    logging.info(f"Сложность исходника: {kbps:.0f} кбит/с при CRF 23, множитель битрейта {factor:.2f}")
+    for rendition in ladder:
+        rendition['bitrate'] = max(1, round(rendition['bitrate'] * factor))
+    return ladder
+
+
+LADDER_ENGINES = {
+    'fixed': fixed_ladder,
+    'per_title': per_title_ladder,
+}
+
+
+def build_ladder(source, source_url, engine=None):
+    engine = engine or LADDER_ENGINE
+    if engine not in LADDER_ENGINES:
+        raise Exception(f"Неизвестная стратегия лестницы: {engine}")
+    ladder = LADDER_ENGINES[engine](source, source_url)
+    logging.info(
+        "Лестница ({}): {}".format(
+            engine, ", ".join(f"{r['height']}p@{r['bitrate']}k" for r in ladder)
+        )
+    )
+    return ladder
+
+
+def rendition_bandwidth(playlist_path, segment_sizes):
+    """
+    Пиковый и средний битрейт (бит/с) разрешения по реальным сегментам:
+    длительности из EXTINF плейлиста, размеры из segment_sizes.
+    """
+    peak = 0
+    total_bits = 0
+    total_duration = 0.0
+    duration = None
+    with open(playlist_path) as f:
+        for line in f.read().splitlines():
+            match = SEGMENT_PATTERN.match(line)
+            if match:
+                duration = float(match.group(1))
+            elif line and not line.startswith('#') and duration:
+                bits = segment_sizes.get(line, 0) * 8
+                peak = max(peak, bits / duration)
+                total_bits += bits
+                total_duration += duration
+                duration = None
+    average = total_bits / total_duration if total_duration else 0
+    return round(peak), round(average)
+
+
+def master_playlist(ladder, source, base_name, temp_dir, segment_sizes):
+    """Мастер-плейлист по фактически закодированным разрешениям."""
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for rendition in ladder:
+        playlist = f"{base_name}_{rendition['name']}.m3u8"
+        peak, average = rendition_bandwidth(os.path.join(temp_dir, playlist), segment_sizes)
+        if not peak:
+            # Размеры сегментов неизвестны - берём целевой битрейт видео и аудио
+            peak = average = (rendition['bitrate'] + 128) * 1000
+        attributes = f"BANDWIDTH={peak},AVERAGE-BANDWIDTH={average}"
+        width = scaled_width(source, rendition['height'])
+        if width:
+            attributes += f",RESOLUTION={width}x{rendition['height']}"
+        lines += [f"#EXT-X-STREAM-INF:{attributes}", playlist]
+    return '\n'.join(lines) + '\n'
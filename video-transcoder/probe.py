@@ -0,0 +1,28 @@
+import json
+import logging
+import subprocess
+
+
+def probe_source(url):
+    """Возвращает длительность (сек) и размеры первого видеопотока источника."""
+    probe_cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=width,height:format=duration',
+        '-of', 'json',
+        url,
+    ]
+    result = subprocess.run(probe_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        stderr = result.stderr.decode()
+        logging.error(f"Ошибка ffprobe: {stderr}")
+        raise Exception(f"Ошибка ffprobe: {stderr}")
+
+    data = json.loads(result.stdout or b"{}")
+    streams = data.get("streams") or [{}]
+    return {
+        "duration": float(data.get("format", {}).get("duration") or 0),
+        "width": int(streams[0].get("width") or 0),
+        "height": int(streams[0].get("height") or 0),
+    }
@@ -2,8 +2,14 @@ import os
 import json
 import pika
 import logging
+import functools
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from urllib.parse import urlparse
 from transcoder import transcode_and_upload
+import scheduler
 import time
 
 logging.basicConfig(level=logging.INFO)
@@ -14,13 +20,153 @@ RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", "5672"))
 RABBITMQ_USER = os.getenv("RABBITMQ_DEFAULT_USER", "guest")
 RABBITMQ_PASS = os.getenv("RABBITMQ_DEFAULT_PASS", "guest")
 RABBITMQ_QUEUE = os.getenv("RABBITMQ_QUEUE", "transcode_queue")
+RABBITMQ_HEARTBEAT = int(os.getenv("RABBITMQ_HEARTBEAT", "60"))
+
+# Fanout-обменник событий "путь на FTP изменился" для ftp-mirror-proxy (пусто - не отправлять)
+MIRROR_EVENTS_EXCHANGE = os.getenv("MIRROR_EVENTS_EXCHANGE", "mirror_events")
+
+# Сколько фильмов транскодируется одновременно (процессов в пуле)
+CONSUMER_CONCURRENCY = int(os.getenv("CONSUMER_CONCURRENCY", "1"))
+# Сколько неподтверждённых сообщений брокер отдаёт заранее
+CONSUMER_PREFETCH = int(os.getenv("CONSUMER_PREFETCH", CONSUMER_CONCURRENCY))
 
 
 RETRY_DELAY = 10
 MAX_RETRIES = None
 
+
+def _init_worker():
+    # Ядра делятся между одновременно идущими фильмами: и число ffmpeg (если не
+    # задано явно), и потоки каждого ffmpeg считаются от доли ядер этого процесса
+    scheduler.CPU_SHARE = max(1, scheduler.CPU_COUNT // CONSUMER_CONCURRENCY)
+    if "TRANSCODE_WORKERS" not in os.environ:
+        scheduler.TRANSCODE_WORKERS = scheduler.CPU_SHARE
+
+
+class TranscodePool:
+    """
+    Пул процессов для транскодирования. Callback pika только ставит задачу
+    в пул, поэтому поток соединения продолжает обслуживать heartbeat, а ack/nack
+    отправляются из него же через add_callback_threadsafe по завершении задачи.
+
+    По каждому movie_id одновременно идёт не больше одной задачи: второй
+    ffmpeg писал бы в тот же transcoded/ и те же пути FTP. Новая задача по
+    фильму в работе (повторная загрузка) ждёт окончания текущей, повторные
+    доставки после переподключения к RabbitMQ отсеивает callback (in_flight).
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        # movie_id -> очередь (future для вызывающего, аргументы); первая задача выполняется
+        self._movies = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self, movie_id):
+        with self._lock:
+            return str(movie_id) in self._movies
+
+    def submit(self, movie_id, *args):
+        key = str(movie_id)
+        result = Future()
+        with self._lock:
+            waiting = self._movies.setdefault(key, deque())
+            waiting.append((result, (movie_id, *args)))
+            busy = len(waiting) > 1
+        if busy:
+            logging.info(f"movie_id={movie_id} уже транскодируется, новая задача ждёт её завершения")
+        else:
+            self._start(key)
+        return result
+
+    def _start(self, key):
+        with self._lock:
+            result, args = self._movies[key][0]
+        try:
+            future = self._submit(*args)
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+        future.add_done_callback(lambda done: self._finished(key, result, done))
+
+    def _finished(self, key, result, done):
+        with self._lock:
+            waiting = self._movies[key]
+            waiting.popleft()
+            if not waiting:
+                del self._movies[key]
+        if done.exception() is not None:
+            result.set_exception(done.exception())
+        else:
+            result.set_result(done.result())
+        if key in self._movies:
+            # Не из потока-менеджера пула, который вызвал этот callback
+            threading.Thread(target=self._start, args=(key,), daemon=True).start()
+
+    def _submit(self, *args):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker
+            )
+        try:
+            return self._executor.submit(transcode_and_upload, *args)
+        except BrokenProcessPool:
+            # Процесс пула упал (например, OOM) - пересоздаём пул
+            logging.error("Пул процессов транскодирования сломан, пересоздаю")
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            return self._submit(*args)
+
+
+def _publish_path_changed(channel, path, movie_id):
+    """Зеркало FTP синхронизирует папку фильма, не дожидаясь полной сверки."""
+    if not MIRROR_EVENTS_EXCHANGE:
+        return
+    message = json.dumps(
+        {"path": path, "event": "transcoded", "movie_id": movie_id, "time": time.time()}
+    )
+    try:
+        channel.basic_publish(
+            exchange=MIRROR_EVENTS_EXCHANGE,
+            routing_key="",
+            body=message,
+            properties=pika.BasicProperties(delivery_mode=2),
+        )
+    except Exception as e:
+        logging.warning(f"Не удалось отправить событие зеркалу для movie_id={movie_id}: {e}")
+
+
+def _job_done(connection, channel, delivery_tag, movie_id, movie_path, future):
+    """Вызывается в потоке пула, подтверждение отправляется из потока соединения."""
+    try:
+        success = future.result() is True
+    except Exception as e:
+        logging.error(f"Ошибка транскодирования movie_id={movie_id}: {e}")
+        success = False
+
+    def settle():
+        if not channel.is_open:
+            logging.warning(
+                f"Канал закрыт, сообщение movie_id={movie_id} будет доставлено повторно"
+            )
+            return
+        # Старые сегменты удалены с FTP и при неудаче, зеркалу нужно обновиться в любом случае
+        _publish_path_changed(channel, movie_path, movie_id)
+        if success:
+            channel.basic_ack(delivery_tag=delivery_tag)
+        else:
+            channel.basic_nack(delivery_tag=delivery_tag, requeue=False)
+        logging.info(f"Задача movie_id={movie_id} завершена: {'успех' if success else 'ошибка'}")
+
+    try:
+        connection.add_callback_threadsafe(settle)
+    except Exception as e:
+        logging.warning(f"Не удалось подтвердить сообщение movie_id={movie_id}: {e}")
+
+
 def start_consumer():
     retries = 0
+    pool = TranscodePool(CONSUMER_CONCURRENCY)
 
     while MAX_RETRIES is None or retries < MAX_RETRIES:
         try:
@@ -31,7 +177,7 @@ def start_consumer():
                 host=RABBITMQ_HOST,
                 port=RABBITMQ_PORT,
                 credentials=credentials,
-                heartbeat=600,
+                heartbeat=RABBITMQ_HEARTBEAT,
                 blocked_connection_timeout=300 
             )
 
@@ -39,6 +185,11 @@ def start_consumer():
             channel = connection.channel()
 
             channel.queue_declare(queue=RABBITMQ_QUEUE, durable=True)
+            if MIRROR_EVENTS_EXCHANGE:
+                channel.exchange_declare(
+                    exchange=MIRROR_EVENTS_EXCHANGE, exchange_type="fanout", durable=True
+                )
+            channel.basic_qos(prefetch_count=max(CONSUMER_PREFETCH, CONSUMER_CONCURRENCY))
 
             def callback(ch, method, properties, body):
                 try:
@@ -63,16 +214,32 @@ def start_consumer():
 
                     logging.info(f"Получено сообщение: movie_id={movie_id}, host={ftp_host}, file_url={file_url}")
 
-                    transcode_and_upload(movie_id, file_url, ftp_host, ftp_user, ftp_password)
+                    if method.redelivered and pool.in_flight(movie_id):
+                        # Повторная доставка после переподключения, фильм уже транскодируется
+                        logging.warning(f"movie_id={movie_id} уже в работе, повторное сообщение подтверждено")
+                        ch.basic_ack(delivery_tag=method.delivery_tag)
+                        return
 
-                    ch.basic_ack(delivery_tag=method.delivery_tag)
+                    future = pool.submit(movie_id, file_url, ftp_host, ftp_user, ftp_password)
+                    future.add_done_callback(
+                        functools.partial(
+                            _job_done,
+                            connection,
+                            ch,
+                            method.delivery_tag,
+                            movie_id,
+                            os.path.dirname(parsed_url.path),
+                        )
+                    )
                 except Exception as e:
                     logging.error(f"Ошибка при обработке сообщения: {e}")
                     ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
 
             channel.basic_consume(queue=RABBITMQ_QUEUE, on_message_callback=callback)
 
-            logging.info("Ожидание сообщений из RabbitMQ...")
+            logging.info(
+                f"Ожидание сообщений из RabbitMQ... (одновременно: {CONSUMER_CONCURRENCY}, prefetch: {max(CONSUMER_PREFETCH, CONSUMER_CONCURRENCY)})"
+            )
             logging.info("Для выхода нажмите CTRL+C")
             channel.start_consuming()
 
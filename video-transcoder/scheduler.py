@@ -0,0 +1,221 @@
+import os
+import math
+import logging
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+HLS_TIME = 2
+
+CPU_COUNT = os.cpu_count() or 1
+# Ядер на этот процесс: при нескольких фильмах одновременно run.py делит CPU_COUNT между ними
+CPU_SHARE = CPU_COUNT
+# Сколько ffmpeg запускать одновременно
+TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", CPU_COUNT))
+# Потоков x264 на один ffmpeg, 0 - поровну делить CPU_SHARE между запущенными ffmpeg
+TRANSCODE_THREADS_PER_JOB = int(os.getenv("TRANSCODE_THREADS_PER_JOB", "0"))
+# Длина куска при разбиении по времени (кратна HLS_TIME), 0 - не разбивать
+TRANSCODE_CHUNK_SECONDS = int(os.getenv("TRANSCODE_CHUNK_SECONDS", "0"))
+TRANSCODE_PRESET = os.getenv("TRANSCODE_PRESET", "medium")
+# Запас номеров сегментов на кусок сверх chunk_seconds / HLS_TIME: из-за
+# расстановки ключевых кадров кусок может выдать лишний хвостовой сегмент
+CHUNK_SEGMENT_SLACK = 8
+
+
+def build_jobs(renditions, duration, base_name, temp_dir, chunk_seconds=None):
+    """
+    Делит работу на задачи: по одной на каждое разрешение или, если задан
+    chunk_seconds, на каждый кусок каждого разрешения. Границы кусков кратны
+    HLS_TIME и совпадают с принудительными ключевыми кадрами, поэтому сегменты
+    кусков склеиваются в один плейлист без перекодирования. Номера сегментов
+    каждого куска идут со своего start_number с запасом, чтобы лишний сегмент
+    не перезаписал первый сегмент следующего куска.
+    """
+    if chunk_seconds is None:
+        chunk_seconds = TRANSCODE_CHUNK_SECONDS
+    chunk_seconds -= chunk_seconds % HLS_TIME
+
+    if chunk_seconds <= 0 or duration <= chunk_seconds:
+        return [
+            {
+                'rendition': rendition,
+                'index': 0,
+                'start': None,
+                'duration': None,
+                'start_number': 0,
+                'playlist': os.path.join(temp_dir, f"{base_name}_{rendition['name']}.m3u8"),
+            }
+            for rendition in renditions
+        ]
+
+    chunks = math.ceil(duration / chunk_seconds)
+    stride = chunk_seconds // HLS_TIME + CHUNK_SEGMENT_SLACK
+    # Сначала первые куски всех разрешений: начало фильма готово раньше
+    return [
+        {
+            'rendition': rendition,
+            'index': index,
+            'start': index * chunk_seconds,
+            'duration': chunk_seconds,
+            'start_number': index * stride,
+            'playlist': os.path.join(
+                temp_dir, f"{base_name}_{rendition['name']}.part{index:04d}.m3u8"
+            ),
+        }
+        for index in range(chunks)
+        for rendition in renditions
+    ]
+
+
+def ffmpeg_command(job, source_url, base_name, temp_dir, threads):
+    rendition = job['rendition']
+    bitrate = rendition['bitrate']
+    chunked = job['start'] is not None
+
+    cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y']
+    if chunked:
+        cmd += ['-ss', str(job['start'])]
+    cmd += ['-i', source_url]
+    if chunked:
+        cmd += ['-t', str(job['duration'])]
+
+    cmd += [
+        # Важные параметры для сохранения целостности
+        '-fflags', '+genpts+igndts',
+        '-flags', '+global_header',
+        '-strict', 'experimental',
+        '-vsync', 'passthrough',
+        '-map', '0:v:0', '-map', '0:a:0?',
+    ]
+
+    if chunked:
+        # Таймстемпы куска продолжают предыдущий кусок
+        cmd += [
+            '-vf', f"scale=-2:{rendition['height']}",
+            '-output_ts_offset', str(job['start']),
+        ]
+    else:
+        cmd += [
+            '-vf', f"setpts=N/FRAME_RATE/TB,scale=-2:{rendition['height']}",
+            '-avoid_negative_ts', 'make_zero',
+            '-copyts',
+            '-start_at_zero',
+        ]
+
+    cmd += [
+        '-force_key_frames', f'expr:gte(t,n_forced*{HLS_TIME})',
+        '-sc_threshold', '0',
+        '-c:v', 'libx264', '-preset', TRANSCODE_PRESET, '-threads', str(threads),
+        '-b:v', f'{bitrate}k', '-maxrate', f'{bitrate}k', '-bufsize', f'{bitrate * 2}k',
+        '-c:a', 'aac', '-b:a', '128k',
+        '-f', 'hls',
+        '-hls_time', str(HLS_TIME),
+        # temp_file: сегмент появляется под своим именем только дописанным
+        '-hls_flags', 'independent_segments+temp_file',
+        '-hls_playlist_type', 'vod',
+        '-hls_segment_type', 'mpegts',
+        '-start_number', str(job['start_number']),
+        '-hls_segment_filename',
+        os.path.join(temp_dir, f"{base_name}_{rendition['name']}_%03d.ts"),
+        job['playlist'],
+    ]
+    return cmd
+
+
+def run_jobs(jobs, source_url, base_name, temp_dir, workers=None):
+    """
+    Запускает задачи параллельно, не больше workers процессов ffmpeg одновременно.
+    При первой ошибке остальные ffmpeg останавливаются, а ошибка пробрасывается.
+    """
+    workers = max(1, min(workers or TRANSCODE_WORKERS, len(jobs)))
+    threads = TRANSCODE_THREADS_PER_JOB or max(1, CPU_SHARE // workers)
+    logging.info(
+        f"Запуск {len(jobs)} задач транскодирования: {workers} параллельно, {threads} потоков на задачу"
+    )
+
+    running = set()
+    lock = threading.Lock()
+    failed = threading.Event()
+
+    def run(job):
+        name = f"{job['rendition']['name']}p, кусок {job['index']}"
+        with lock:
+            if failed.is_set():
+                return
+            process = subprocess.Popen(
+                ffmpeg_command(job, source_url, base_name, temp_dir, threads),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+            running.add(process)
+
+        _, stderr = process.communicate()
+        with lock:
+            running.discard(process)
+
+        if process.returncode != 0:
+            if failed.is_set():
+                return
+            failed.set()
+            with lock:
+                for other in running:
+                    other.kill()
+            stderr = stderr.decode(errors='replace')
+            logging.error(f"Ошибка при транскодировании ({name}): {stderr}")
+            raise Exception(f"Ошибка транскодирования ({name}): {stderr}")
+
+        logging.info(f"Готово: {name}")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run, job) for job in jobs]
+        for future in as_completed(futures):
+            future.result()
+
+
+def stitch_playlists(jobs):
+    """
+    Склеивает плейлисты кусков в плейлист разрешения и удаляет плейлисты кусков.
+    Если сегменты кусков всё же пересеклись по именам, бросает исключение.
+    """
+    by_rendition = {}
+    for job in jobs:
+        if job['start'] is not None:
+            by_rendition.setdefault(job['rendition']['name'], []).append(job)
+
+    for name, chunks in by_rendition.items():
+        chunks.sort(key=lambda job: job['index'])
+        target_duration = HLS_TIME
+        segments = []
+        owners = {}
+
+        for position, job in enumerate(chunks):
+            if position:
+                segments.append('#EXT-X-DISCONTINUITY')
+            with open(job['playlist']) as f:
+                for line in f.read().splitlines():
+                    if line.startswith('#EXT-X-TARGETDURATION:'):
+                        target_duration = max(target_duration, int(line.split(':', 1)[1]))
+                    elif line.startswith('#EXTINF:'):
+                        segments.append(line)
+                    elif line and not line.startswith('#'):
+                        if line in owners:
+                            raise Exception(
+                                f"Сегмент {line} выдали куски {owners[line]} и {job['index']} ({name}p)"
+                            )
+                        owners[line] = job['index']
+                        segments.append(line)
+            os.remove(job['playlist'])
+
+        playlist_path = chunks[0]['playlist'].replace('.part0000', '')
+        with open(playlist_path, 'w') as f:
+            f.write(
+                '#EXTM3U\n'
+                '#EXT-X-VERSION:3\n'
+                f'#EXT-X-TARGETDURATION:{target_duration}\n'
+                '#EXT-X-MEDIA-SEQUENCE:0\n'
+                '#EXT-X-PLAYLIST-TYPE:VOD\n'
+                '#EXT-X-INDEPENDENT-SEGMENTS\n'
+            )
+            f.write('\n'.join(segments))
+            f.write('\n#EXT-X-ENDLIST\n')
+        logging.info(f"Плейлист {playlist_path} склеен из {len(chunks)} кусков")